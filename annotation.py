@@ -0,0 +1,122 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+import config
+
+# RGB per class, white for anything else
+CLASS_COLORS = {
+    "hardhat": (255, 255, 0),   # Yellow
+    "vest": (128, 0, 128),      # Purple
+    "gloves": (255, 0, 0),      # Red
+    "shoes": (0, 255, 255),     # Cyan
+}
+DEFAULT_COLOR = (255, 255, 255)
+
+
+def load_font(size, candidates=config.ANNOTATION_FONTS):
+    """First TrueType font that loads (PIL also searches the system font folders), else PIL's default."""
+    for name in candidates:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    print(f"⚠️ None of {', '.join(candidates)} found, using PIL's default font")
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow < 10.1 only has the fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+class AnnotationRenderer:
+    """Draws detection boxes and labels straight onto BGR frames, in place.
+
+    The font is loaded once and every label badge ("vest 0.87" on its class colour) is
+    rendered with PIL the first time it is needed, then kept as a BGR array; drawing a
+    frame is one cv2.rectangle per box plus a slice copy per label, cheap enough for
+    live previews.
+    """
+
+    def __init__(self, font_size=config.ANNOTATION_FONT_SIZE, thickness=config.ANNOTATION_THICKNESS,
+                 colors=CLASS_COLORS, max_badges=1024):
+        self.font = load_font(font_size)
+        self.thickness = thickness
+        self.colors = colors
+        self.padding = max(2, font_size // 5)
+        self.max_badges = max_badges
+        self.badges = {}
+        # Class names are known up front, so their badges (and the font's glyphs) are ready before the first frame
+        for name in colors:
+            self.badge(name, name)
+
+    def color(self, name):
+        return self.colors.get(name, DEFAULT_COLOR)
+
+    def badge(self, text, name=None):
+        """BGR image of text on the class colour, rendered once per distinct text."""
+        key = (text, name)
+        badge = self.badges.get(key)
+        if badge is None:
+            if len(self.badges) >= self.max_badges:
+                self.badges.clear()
+            x0, y0, x1, y1 = self.font.getbbox(text)
+            r, g, b = self.color(name or text)
+            # Black text on light colours (yellow, cyan, white), white on dark ones
+            ink = (0, 0, 0) if 0.299 * r + 0.587 * g + 0.114 * b > 150 else (255, 255, 255)
+            image = Image.new("RGB", (x1 - x0 + 2 * self.padding, y1 - y0 + 2 * self.padding), (r, g, b))
+            ImageDraw.Draw(image).text((self.padding - x0, self.padding - y0), text, fill=ink, font=self.font)
+            badge = self.badges[key] = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR)
+        return badge
+
+    def draw(self, frame, detections, scale=1.0, confidence=True):
+        """Draw every detection on frame (BGR, modified in place) scaled by `scale` from detector coordinates."""
+        height, width = frame.shape[:2]
+        boxes = (detections.xyxy * scale).astype(int).tolist()
+        for (x0, y0, x1, y1), score, name in zip(boxes, detections.confidence, detections.labels):
+            r, g, b = self.color(name)
+            cv2.rectangle(frame, (x0, y0), (x1, y1), (b, g, r), self.thickness)
+            badge = self.badge(f"{name} {score:.2f}" if confidence else name, name)
+            bh, bw = badge.shape[:2]
+            # Above the box, or just inside it when the box touches the top edge
+            top = y0 - bh if y0 - bh >= 0 else max(0, y0)
+            left = min(max(0, x0), width - 1)
+            bh, bw = min(bh, height - top), min(bw, width - left)
+            if bh > 0 and bw > 0:
+                frame[top:top + bh, left:left + bw] = badge[:bh, :bw]
+        return frame
+
+
+def encode(frame, ext=".jpg", quality=config.ANNOTATED_RESULT_QUALITY):
+    """Encode a BGR frame as JPEG (quality 0-100) or PNG (quality maps to compression 9-0)."""
+    if ext.lower() == ".png":
+        params = [cv2.IMWRITE_PNG_COMPRESSION, max(0, min(9, 9 - int(quality) // 11))]
+    else:
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+    ok, buf = cv2.imencode(ext, frame, params)
+    if not ok:
+        raise ValueError(f"Could not encode frame as {ext}")
+    return buf.tobytes()
+
+
+def save(frame, path=config.ANNOTATED_RESULT_PATH, quality=config.ANNOTATED_RESULT_QUALITY):
+    """Write a BGR frame to path, format taken from the extension (.jpg/.jpeg/.png)."""
+    data = encode(frame, os.path.splitext(path)[1] or ".jpg", quality)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer():
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = AnnotationRenderer()
+    return _renderer
@@ -0,0 +1,201 @@
+import time
+import sqlite3
+import datetime
+import threading
+
+import config
+import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_number TEXT NOT NULL,
+    direction TEXT NOT NULL,          -- 'in' (front gate) or 'out' (back gate)
+    ts REAL NOT NULL,                 -- unix time of the scan
+    hardhat INTEGER,                  -- PPE flags, NULL until checked
+    vest INTEGER,
+    gloves INTEGER,
+    compliant INTEGER,
+    ppe_cache TEXT,                   -- compliance cache lookup: 'hit', 'miss', 'expired', NULL when off
+    cache_evictions INTEGER,          -- cache entries this result pushed out
+    dirty INTEGER NOT NULL DEFAULT 1, -- not yet mirrored to Firebase
+    revision INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS events_id_ts ON events (id_number, ts);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS events_direction_ts ON events (direction, ts);
+CREATE INDEX IF NOT EXISTS events_compliant_ts ON events (compliant, ts);
+CREATE INDEX IF NOT EXISTS events_dirty ON events (id) WHERE dirty = 1;
+
+-- Last accepted movement per worker, so "who is inside" never scans the log
+CREATE TABLE IF NOT EXISTS presence (
+    id_number TEXT PRIMARY KEY,
+    direction TEXT NOT NULL,
+    ts REAL NOT NULL,
+    event_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS presence_direction ON presence (direction, ts);
+"""
+
+# Columns added after the first release, created on databases that predate them
+MIGRATIONS = {"events": [("ppe_cache", "TEXT"), ("cache_evictions", "INTEGER")]}
+
+
+def firebase_key(row):
+    """Node name for a mirrored event: the old timestamp key plus the row id, so same-second scans never collide."""
+    stamp = datetime.datetime.fromtimestamp(row["ts"]).strftime("%Y-%m-%d %H:%M:%S")
+    return f"{stamp}_{row['id']}"
+
+
+class AttendanceStore:
+    """Local SQLite log of every gate entry/exit and PPE result, mirrored incrementally to Firebase."""
+
+    def __init__(self, path=config.ATTENDANCE_DB_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        self.sync_callbacks = {}
+        self.sync_thread = None
+        self.sync_event = threading.Event()
+
+    def _migrate(self):
+        with self.conn:
+            for table, columns in MIGRATIONS.items():
+                existing = {row["name"] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+                for name, kind in columns:
+                    if name not in existing:
+                        self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {kind}")
+
+    # --- Writes ---
+
+    def record_scan(self, id_number, direction, ts=None, on_synced=None):
+        """Log a QR scan and return its event id. Exits count as leaving straight away.
+
+        on_synced is registered before the row is committed, so the sync thread cannot
+        hand the row to Firebase ahead of it.
+        """
+        ts = ts or time.time()
+        with metrics.span("attendance_write", kind="scan"), self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO events (id_number, direction, ts) VALUES (?, ?, ?)", (id_number, direction, ts))
+            event_id = cursor.lastrowid
+            if on_synced is not None:
+                self.sync_callbacks[event_id] = on_synced
+            if direction == 'out':
+                self._set_presence(id_number, direction, ts, event_id)
+        return event_id
+
+    def record_ppe(self, event_id, hardhat, vest, gloves, cache=None, cache_evictions=None):
+        """Attach a PPE check to a scan; a compliant entry marks the worker as inside.
+
+        cache is the compliance cache lookup for this scan and cache_evictions the entries
+        the result pushed out of it; both stay NULL with the cache off.
+        """
+        compliant = int(bool(hardhat and vest and gloves))
+        with metrics.span("attendance_write", kind="ppe"), self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE events SET hardhat = ?, vest = ?, gloves = ?, compliant = ?, ppe_cache = ?, "
+                "cache_evictions = ?, dirty = 1, revision = revision + 1 WHERE id = ?",
+                (hardhat, vest, gloves, compliant, cache, cache_evictions, event_id))
+            row = self.conn.execute("SELECT id_number, direction, ts FROM events WHERE id = ?", (event_id,)).fetchone()
+            if compliant and row is not None and row["direction"] == 'in':
+                self._set_presence(row["id_number"], 'in', row["ts"], event_id)
+        return compliant
+
+    def _set_presence(self, id_number, direction, ts, event_id):
+        self.conn.execute(
+            "INSERT INTO presence (id_number, direction, ts, event_id) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(id_number) DO UPDATE SET direction = excluded.direction, ts = excluded.ts, "
+            "event_id = excluded.event_id WHERE excluded.ts >= presence.ts",
+            (id_number, direction, ts, event_id))
+
+    # --- Queries ---
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def entries_by_id(self, id_number, start=None, end=None, limit=None):
+        sql = "SELECT * FROM events WHERE id_number = ? AND ts >= ? AND ts < ? ORDER BY ts"
+        params = [id_number, start or 0, end or float('inf')]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._query(sql, params)
+
+    def non_compliant(self, start, end):
+        """PPE checks in [start, end) that failed."""
+        return self._query(
+            "SELECT * FROM events WHERE compliant = 0 AND ts >= ? AND ts < ? ORDER BY ts", (start, end))
+
+    def currently_inside(self):
+        return self._query("SELECT id_number, ts, event_id FROM presence WHERE direction = 'in' ORDER BY ts")
+
+    # --- Firebase mirror ---
+
+    def on_synced(self, event_id, callback):
+        """Call callback once event_id has been handed to Firebase."""
+        with self.lock:
+            self.sync_callbacks[event_id] = callback
+
+    def sync(self, writer, path=config.ATTENDANCE_FIREBASE_PATH, batch_size=500):
+        """Mirror new and changed rows to Firebase through the write queue. Returns the number of rows sent."""
+        sent = 0
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT * FROM events WHERE dirty = 1 ORDER BY id LIMIT ?", (batch_size,)).fetchall()
+            if not rows:
+                return sent
+            for row in rows:
+                record = {'ID Number': row["id_number"], 'direction': row["direction"]}
+                if row["compliant"] is not None:
+                    record.update(hardhat=row["hardhat"], vest=row["vest"], gloves=row["gloves"])
+                if row["ppe_cache"] is not None:
+                    record.update(ppe_cache=row["ppe_cache"], cache_evictions=row["cache_evictions"] or 0)
+                with self.lock:
+                    callback = self.sync_callbacks.pop(row["id"], None)
+                writer.set(f"{path}/{firebase_key(row)}", record, callback=callback)
+            # The write queue journals anything it cannot deliver, so rows are done once queued,
+            # unless they changed again in the meantime
+            with self.lock, self.conn:
+                self.conn.executemany(
+                    "UPDATE events SET dirty = 0 WHERE id = ? AND revision = ?",
+                    [(row["id"], row["revision"]) for row in rows])
+            sent += len(rows)
+
+    def request_sync(self):
+        self.sync_event.set()
+
+    def start_sync(self, writer, interval=config.ATTENDANCE_SYNC_INTERVAL):
+        """Mirror on a background thread every interval seconds, or sooner after request_sync()."""
+        def run():
+            while True:
+                self.sync_event.wait(timeout=interval)
+                self.sync_event.clear()
+                try:
+                    self.sync(writer)
+                except Exception as e:
+                    print(f"⚠️ Attendance sync failed: {e}")
+        if self.sync_thread is None:
+            self.sync_thread = threading.Thread(target=run, name="attendance-sync", daemon=True)
+            self.sync_thread.start()
+            self.request_sync()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_attendance_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AttendanceStore()
+    return _store
@@ -1,16 +1,232 @@
-import pygame
+"""Spoken gate prompts: every clip in AUDIO_DIR decoded into memory once, played on one thread.
+
+    python audio.py                          # every prompt in config.AUDIO_PROMPTS, in turn
+    python audio.py access_granted           # one prompt
+"""
+import os
+import sys
 import time
+import heapq
+import threading
+from itertools import count
+
+import config
+import metrics
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".ogg")
+
+
+class NullAudioBackend:
+    """Plays nothing; keeps what it was asked to play, for headless runs and tests."""
+    name = "null"
+
+    def __init__(self, length=0.0):
+        self.clip_length = length
+        self.played = []
+
+    def load(self, path):
+        return os.path.basename(path)
+
+    def length(self, clip):
+        return self.clip_length
+
+    def play(self, clip):
+        self.played.append(clip)
+
+    def stop(self):
+        pass
+
+
+class PygameAudioBackend:
+    """pygame.mixer Sounds: decoded to PCM when loaded, so playing one never touches the disk."""
+    name = "pygame"
+
+    def __init__(self, volume=config.AUDIO_VOLUME):
+        import pygame
+        self.pygame = pygame
+        pygame.mixer.init()
+        self.volume = volume
+
+    def load(self, path):
+        sound = self.pygame.mixer.Sound(path)
+        sound.set_volume(self.volume)
+        return sound
+
+    def length(self, clip):
+        return clip.get_length()
+
+    def play(self, clip):
+        clip.play()
+
+    def stop(self):
+        self.pygame.mixer.stop()
+
+
+def create_audio_backend(kind=None):
+    kind = kind or config.AUDIO_BACKEND
+    if kind == "null":
+        return NullAudioBackend()
+    if kind == "pygame":
+        try:
+            return PygameAudioBackend()
+        except Exception as e:
+            print(f"⚠️ Audio unavailable ({e}), prompts are silent")
+            return NullAudioBackend()
+    raise ValueError(f"Unknown audio backend: {kind}")
+
+
+class AudioPrompts:
+    """Plays gate prompts on a dedicated thread, highest priority first.
+
+    say() only queues and returns, so the engine thread, the Kivy clock and the capture
+    loop never wait on audio. A prompt of at least the playing one's priority cuts it
+    off: the gate has moved on and the old prompt is stale. A lower-priority prompt waits
+    its turn, and is dropped if it has waited more than max_age seconds.
+    """
+
+    def __init__(self, backend=None, directory=config.AUDIO_DIR, prompts=config.AUDIO_PROMPTS,
+                 priorities=config.AUDIO_PRIORITIES, max_age=config.AUDIO_MAX_AGE, clock=time.monotonic):
+        self.backend = backend or create_audio_backend()
+        self.directory = directory
+        self.prompts = prompts
+        self.priorities = priorities
+        self.max_age = max_age
+        self.clock = clock
+        self.clips = {}
+        self.pending = []
+        self.seq = count()
+        self.cond = threading.Condition()
+        self.counts = {"queued": 0, "played": 0, "interrupted": 0, "stale": 0, "missing": 0, "errors": 0}
+        self.running = False
+        self.thread = None
+
+    def load(self):
+        """Decode every clip in the directory; returns the number loaded."""
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.lower().endswith(AUDIO_EXTENSIONS)) if os.path.isdir(self.directory) else []
+        for name in names:
+            try:
+                self.clips[name] = self.backend.load(os.path.join(self.directory, name))
+            except Exception as e:
+                print(f"⚠️ Could not load {name}: {e}")
+        missing = sorted(prompt for prompt, clip in self.prompts.items() if clip not in self.clips)
+        if missing:
+            print(f"⚠️ No clip in {self.directory}/ for prompt(s): {', '.join(missing)}")
+        return len(self.clips)
+
+    def start(self):
+        if self.thread is None:
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name="audio", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        self.backend.stop()
+
+    def say(self, prompt):
+        """Queue a prompt by name and return at once; False when it has no clip."""
+        if self.prompts.get(prompt) not in self.clips:
+            self.counts["missing"] += 1
+            return False
+        with self.cond:
+            heapq.heappush(self.pending, (-self.priorities.get(prompt, 0), next(self.seq), prompt, self.clock()))
+            self.counts["queued"] += 1
+            self.cond.notify()
+        return True
+
+    def _drop_stale(self, now):
+        fresh = [item for item in self.pending if now - item[3] <= self.max_age]
+        for item in self.pending:
+            if now - item[3] > self.max_age:
+                self.counts["stale"] += 1
+                metrics.inc("audio_prompts", prompt=item[2], result="stale")
+        if len(fresh) != len(self.pending):
+            heapq.heapify(fresh)
+            self.pending = fresh
+
+    def _next(self, playing):
+        """Block until a prompt may play now: (priority, prompt), or None when stopped."""
+        with self.cond:
+            while self.running:
+                now = self.clock()
+                if playing is not None and now >= playing[2]:
+                    playing = None
+                self._drop_stale(now)
+                if self.pending and (playing is None or -self.pending[0][0] >= playing[0]):
+                    priority, _, prompt, _ = heapq.heappop(self.pending)
+                    return -priority, prompt
+                self.cond.wait(None if playing is None else playing[2] - now)
+        return None
+
+    def _run(self):
+        playing = None  # (priority, prompt, ends_at)
+        while True:
+            item = self._next(playing)
+            if item is None:
+                return
+            priority, prompt = item
+            if playing is not None and self.clock() < playing[2]:
+                self.backend.stop()
+                self.counts["interrupted"] += 1
+                metrics.inc("audio_prompts", prompt=playing[1], result="interrupted")
+            clip = self.clips[self.prompts[prompt]]
+            try:
+                self.backend.play(clip)
+            except Exception as e:
+                print(f"⚠️ Could not play {prompt}: {e}")
+                self.counts["errors"] += 1
+                playing = None
+                continue
+            self.counts["played"] += 1
+            metrics.inc("audio_prompts", prompt=prompt, result="played")
+            playing = (priority, prompt, self.clock() + self.backend.length(clip))
+
+    # --- Gate events ---
+
+    def on_gate_event(self, engine, kind):
+        """GateEngine listener; runs on the engine thread, so it only queues."""
+        if kind == "state" and engine.state == "countdown":
+            self.say("countdown")
+        elif kind == "scanned":
+            self.say("scan_accepted")
+        elif kind == "ppe_result":
+            self.say("access_granted" if all(engine.ppe_flags.values()) else "ppe_incomplete")
+
+    def stats(self):
+        with self.cond:
+            return dict(self.counts, clips=len(self.clips), pending=len(self.pending), backend=self.backend.name)
+
+
+_prompts = None
+_prompts_lock = threading.Lock()
+
+
+def get_audio_prompts():
+    """Process-wide prompt player, clips loaded and thread started on first use."""
+    global _prompts
+    if _prompts is None:
+        with _prompts_lock:
+            if _prompts is None:
+                prompts = AudioPrompts()
+                prompts.load()
+                _prompts = prompts.start()
+    return _prompts
+
+
+def main():
+    player = get_audio_prompts()
+    for prompt in sys.argv[1:] or list(player.prompts):
+        if not player.say(prompt):
+            print(f"❌ Unknown prompt or missing clip: {prompt}")
+            continue
+        print(f"🔊 {prompt} ({player.prompts[prompt]})")
+        time.sleep(player.backend.length(player.clips[player.prompts[prompt]]) + 0.5)
+    player.stop()
+
 
-pygame.init()
-pygame.mixer.init()
-
-pygame.mixer.music.set_volume(1.0)
-pygame.mixer.music.load('voices/1.mp3')
-pygame.mixer.music.play()
-while pygame.mixer.music.get_busy():
-    time.sleep(0.1)
-time.sleep(5)
-pygame.mixer.music.load('voices/2.mp3')
-pygame.mixer.music.play()
-while pygame.mixer.music.get_busy():
-    time.sleep(0.1)
+if __name__ == "__main__":
+    main()
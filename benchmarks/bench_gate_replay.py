@@ -0,0 +1,392 @@
+"""Replay recorded video or image folders through the gate pipeline and measure it.
+
+    python benchmarks/bench_gate_replay.py --sessions 50
+    python benchmarks/bench_gate_replay.py --qr-source qr.mp4 --ppe-source ppe_img/sample.mp4 --detector-latency 120
+    python benchmarks/bench_gate_replay.py --lanes 4 --workers 2 --output results/4-lanes.json
+
+Frames go through the same CameraStream → QR decode → PPE inference → decision path as
+the app (GateEngine, QRDecodePool, StreamingPPEChecker, FirebaseWriteQueue); only the
+detector and Firebase are local stand-ins with configurable latency.
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import threading
+import argparse
+import platform
+import subprocess
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import config  # noqa: E402
+from metrics import percentile  # noqa: E402
+from camera_manager import CameraStream  # noqa: E402
+from scheduler import LaneScheduler  # noqa: E402
+from lanes import Lane  # noqa: E402
+from firebase_writer import FirebaseWriteQueue  # noqa: E402
+from attendance_store import AttendanceStore  # noqa: E402
+from gate_engine import GateEngine, COUNTDOWN, SCAN, PPE_CHECK, GRANTED, IDLE  # noqa: E402
+from ppe_stream import REQUIRED_PPE  # noqa: E402
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+QR_TEXT = "BENCH-0001"
+
+
+# --- Frame sources ---
+
+def synthetic_frames(count=30, size=(640, 480), qr_text=None, seed=0):
+    """Noise frames, optionally with a real QR code pasted in the centre so pyzbar has work to do."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    code = None
+    if qr_text:
+        code = cv2.QRCodeEncoder.create().encode(qr_text)
+        side = min(w, h) // 2
+        code = cv2.resize(code, (side, side), interpolation=cv2.INTER_NEAREST)
+        code = cv2.cvtColor(code, cv2.COLOR_GRAY2BGR)
+    frames = []
+    for _ in range(count):
+        frame = rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+        if code is not None:
+            y0, x0 = (h - code.shape[0]) // 2, (w - code.shape[1]) // 2
+            frame[y0:y0 + code.shape[0], x0:x0 + code.shape[1]] = code
+        frames.append(frame)
+    return frames
+
+
+def load_frames(source, limit, qr_text=None):
+    if source == "synthetic":
+        return synthetic_frames(qr_text=qr_text)
+    if os.path.isdir(source):
+        names = sorted(n for n in os.listdir(source) if n.lower().endswith(IMAGE_EXTENSIONS))[:limit]
+        frames = [cv2.imread(os.path.join(source, n)) for n in names]
+    else:
+        capture = cv2.VideoCapture(source)
+        frames = []
+        while len(frames) < limit:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            frames.append(frame)
+        capture.release()
+    frames = [f for f in frames if f is not None]
+    if not frames:
+        print(f"⚠️ No frames in {source}, using synthetic frames instead")
+        return synthetic_frames(qr_text=qr_text)
+    return frames
+
+
+class FrameListCapture:
+    """cv2.VideoCapture stand-in looping over decoded frames."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.position = 0
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        frame = self.frames[self.position % len(self.frames)]
+        self.position += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+class ReplayCamera(CameraStream):
+    """The app's CameraStream (ring buffer, waits, stats) fed from frames in memory at a fixed rate."""
+
+    def __init__(self, name, frames, fps):
+        super().__init__(name)
+        self.source_frames = frames
+        self.replay_fps = fps
+
+    def _open(self):
+        self.capture = FrameListCapture(self.source_frames)
+        self.frame_interval = 1.0 / self.replay_fps if self.replay_fps > 0 else 0.0
+
+
+class ReplayCameras:
+    """CameraManager stand-in: lane camera "indexes" are role names mapped to replay streams."""
+
+    def __init__(self, sources, fps):
+        self.sources = sources
+        self.fps = fps
+        self.streams = {}
+
+    def get(self, index):
+        stream = self.streams.get(index)
+        if stream is None:
+            role = index.split(":")[-1]
+            stream = self.streams[index] = ReplayCamera(index, self.sources[role], self.fps).start()
+        return stream
+
+    def open_all(self, indexes):
+        for index in indexes:
+            self.get(index)
+
+    def stats(self):
+        return {index: stream.stats() for index, stream in self.streams.items()}
+
+    def release_all(self):
+        for stream in self.streams.values():
+            stream.stop()
+
+
+# --- Service stand-ins ---
+
+# One worker in the middle of the frame, (cx, cy, w, h) as fractions, so the person tracker groups the boxes
+FAKE_LAYOUT = {"hardhat": (0.5, 0.25, 0.125, 0.1), "vest": (0.5, 0.5, 0.25, 0.25), "gloves": (0.33, 0.7, 0.08, 0.08)}
+
+
+class FakeDetector:
+    """Returns every required PPE class after latency ± jitter ms; miss_rate drops a class at random."""
+
+    def __init__(self, latency_ms, jitter_ms=0.0, miss_rate=0.0, error_rate=0.0, seed=0):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.miss_rate = miss_rate
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    def infer(self, image, model_id=None):
+        self.calls += 1
+        time.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+        if self.rng.random() < self.error_rate:
+            raise RuntimeError("fake detector error")
+        h, w = image.shape[:2]
+        predictions = []
+        for name in REQUIRED_PPE:
+            if self.rng.random() < self.miss_rate:
+                continue
+            cx, cy, bw, bh = FAKE_LAYOUT[name]
+            predictions.append({"x": w * cx, "y": h * cy, "width": w * bw, "height": h * bh,
+                                "confidence": 0.9, "class": name})
+        return {"predictions": predictions}
+
+
+class FakeDecoder:
+    """QRDecodePool stand-in for sources without QR codes: "decodes" QR_TEXT after latency ms."""
+
+    def __init__(self, latency_ms):
+        self.latency = latency_ms / 1000.0
+        self.decode_times = []
+
+    def submit(self, frame, seq, callback, lane=None):
+        def decoded():
+            self.decode_times.append(self.latency)
+            callback(SimpleNamespace(seq=seq, data=[QR_TEXT], mode="fake", decode_time=self.latency,
+                                     decoded_at=time.time()))
+        threading.Timer(self.latency, decoded).start()
+        return True
+
+    def record_write(self, result):
+        pass
+
+
+class FakeFirebaseRef:
+    """Root reference stand-in for FirebaseWriteQueue: update() takes latency ms and keeps the data."""
+
+    def __init__(self, latency_ms):
+        self.latency = latency_ms / 1000.0
+        self.data = {}
+        self.updates = 0
+
+    def update(self, values):
+        time.sleep(self.latency)
+        self.updates += 1
+        self.data.update(values)
+
+
+# --- Measurement ---
+
+def summarize(values, scale=1000.0):
+    values = list(values)
+    return {
+        "count": len(values),
+        "mean_ms": float(np.mean(values)) * scale if values else 0.0,
+        "p50_ms": percentile(values, 50) * scale,
+        "p95_ms": percentile(values, 95) * scale,
+        "p99_ms": percentile(values, 99) * scale,
+    }
+
+
+class SessionRecorder:
+    """Engine listener timing each state, and trigger → decision per session."""
+
+    def __init__(self, direction, reuse_compliance=False):
+        self.direction = direction
+        self.reuse_compliance = reuse_compliance
+        self.entered = {}
+        self.stages = {COUNTDOWN: [], SCAN: [], PPE_CHECK: []}
+        self.time_to_decision = []
+
+    def __call__(self, engine, kind):
+        if kind != "state":
+            return
+        now = time.perf_counter()
+        state = engine.state
+        for previous in self.stages:
+            if previous in self.entered and state != previous:
+                self.stages[previous].append(now - self.entered.pop(previous))
+        if state in self.stages:
+            self.entered[state] = now
+        if state == COUNTDOWN:
+            self.session_start = now
+        if state == GRANTED or (state == IDLE and engine.direction == "back"):
+            self.time_to_decision.append(now - self.session_start)
+        if state == IDLE:
+            if not self.reuse_compliance:
+                # The replay keeps one worker in view and scans one ID; start each session's check from nothing
+                engine.lane.tracker.reset()
+                engine.compliance.clear()
+            engine.lane.triggers.set(self.direction, 1)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--qr-source", default="synthetic", help="video, image folder or 'synthetic' (QR code drawn in)")
+    parser.add_argument("--ppe-source", default=os.path.join("ppe_img", "sample.mp4"))
+    parser.add_argument("--max-frames", type=int, default=300, help="frames loaded per source")
+    parser.add_argument("--fps", type=float, default=30.0, help="replay rate per camera")
+    parser.add_argument("--qr", choices=["real", "fake"], default="real", help="pyzbar decode pool or a stand-in")
+    parser.add_argument("--qr-latency", type=float, default=5.0, help="ms, with --qr fake")
+    parser.add_argument("--detector-latency", type=float, default=80.0, help="ms per fake inference")
+    parser.add_argument("--detector-jitter", type=float, default=20.0)
+    parser.add_argument("--miss-rate", type=float, default=0.1, help="chance a PPE class is missed per frame")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="chance a fake inference raises")
+    parser.add_argument("--firebase-latency", type=float, default=40.0, help="ms per fake multi-path update")
+    parser.add_argument("--lanes", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=config.LANE_INFERENCE_WORKERS, help="shared inference workers")
+    parser.add_argument("--direction", choices=["front", "back"], default="front")
+    parser.add_argument("--sessions", type=int, default=20, help="sessions per lane")
+    parser.add_argument("--reuse-compliance", action="store_true",
+                        help="let back-to-back sessions reuse a tracked worker's or a cached ID's PPE result "
+                             "(off: every check runs in full)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="give up after this many seconds")
+    parser.add_argument("--output", help="JSON results file (default benchmarks/results/replay-<time>.json)")
+    args = parser.parse_args()
+
+    qr_frames = load_frames(args.qr_source, args.max_frames, qr_text=QR_TEXT)
+    ppe_frames = load_frames(args.ppe_source, args.max_frames)
+    sources = {"qr_front": qr_frames, "qr_back": qr_frames, "ppe": ppe_frames}
+    workdir = tempfile.mkdtemp(prefix="gate-replay-")
+    # Annotation is still timed, but the result image goes to the scratch folder, not the repo's artifact
+    config.ANNOTATED_RESULT_PATH = os.path.join(workdir, os.path.basename(config.ANNOTATED_RESULT_PATH))
+
+    cameras = ReplayCameras(sources, args.fps)
+    if args.qr == "real":
+        from qr_decoder import QRDecodePool
+        decoder = QRDecodePool()
+    else:
+        decoder = FakeDecoder(args.qr_latency)
+    detector = FakeDetector(args.detector_latency, args.detector_jitter, args.miss_rate, args.error_rate)
+    scheduler = LaneScheduler(workers=args.workers, name="bench-infer")
+    firebase = FakeFirebaseRef(args.firebase_latency)
+    writer = FirebaseWriteQueue(root_ref=firebase, journal_path=os.path.join(workdir, "journal.jsonl")).start()
+    attendance = AttendanceStore(os.path.join(workdir, "attendance.db"))
+    attendance.start_sync(writer)
+
+    timings = {"qr_countdown": 0, "ppe_countdown": 0, "granted_delay": 0, "retry_delay": 0, "result": 0,
+               "confirm_delay": 0}
+    engines, recorders = [], []
+    for i in range(args.lanes):
+        name = f"lane-{i + 1}"
+        lane = Lane(name, f"{name}:qr_front", f"{name}:qr_back", f"{name}:ppe",
+                    front_path=f"/{name}/front", back_path=f"/{name}/back",
+                    door_status_path=f"/{name}/door_status", trigger_source="fake")
+        cameras.open_all(lane.camera_indexes)
+        engine = GateEngine(lane, scheduler.detector(name, detector), cameras, decoder, writer, attendance, timings)
+        recorder = SessionRecorder(args.direction, args.reuse_compliance)
+        engine.add_listener(recorder)
+        engines.append(engine)
+        recorders.append(recorder)
+
+    print(f"▶️ Replaying {len(qr_frames)} QR / {len(ppe_frames)} PPE frames at {args.fps:g} fps "
+          f"through {args.lanes} lane(s), {args.sessions} session(s) each")
+    start = time.perf_counter()
+    for engine in engines:
+        engine.start()
+    target = args.sessions * args.lanes
+    while sum(e.sessions for e in engines) < target and time.perf_counter() - start < args.timeout:
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    for engine in engines:
+        engine.stop()
+    camera_stats = cameras.stats()
+    cameras.release_all()
+    writer.stop()
+
+    sessions = sum(e.sessions for e in engines)
+    stages = {stage: [] for stage in (COUNTDOWN, SCAN, PPE_CHECK)}
+    time_to_decision = []
+    for recorder in recorders:
+        for stage, values in recorder.stages.items():
+            stages[stage].extend(values)
+        time_to_decision.extend(recorder.time_to_decision)
+    scheduler_stats = scheduler.stats()
+    results = {
+        "version": git_revision(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "args": vars(args),
+        "elapsed_s": elapsed,
+        "sessions": sessions,
+        "sessions_per_min": sessions / elapsed * 60 if elapsed else 0.0,
+        "time_to_decision": summarize(time_to_decision),
+        "stages": {
+            "qr_scan": summarize(stages[SCAN]),
+            "ppe_check": summarize(stages[PPE_CHECK]),
+            "qr_decode": summarize(decoder.decode_times),
+            "inference_wait": summarize(w for lane in scheduler.lane_stats.values() for w in lane.wait_times),
+            "inference": summarize(s for lane in scheduler.lane_stats.values() for s in lane.service_times),
+            "firebase_flush": summarize(writer.flush_latencies),
+        },
+        "throughput": {
+            "camera_fps": {index: stats["fps"] for index, stats in camera_stats.items()},
+            "camera_dropped": sum(stats["dropped"] for stats in camera_stats.values()),
+            "inference_fps": detector.calls / elapsed if elapsed else 0.0,
+            "inference_errors": sum(stats["errors"] for stats in scheduler_stats.values()),
+            "firebase_updates": firebase.updates,
+        },
+        "lanes": {e.lane.name: dict(e.lane.stats(), sessions=e.sessions) for e in engines},
+        "compliance_cache": engines[0].compliance.stats() if engines else {},
+    }
+
+    print(f"✅ {sessions} sessions in {elapsed:.1f}s ({results['sessions_per_min']:.0f}/min)")
+    print(f"{'stage':<16} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage, summary in [("time_to_decision", results["time_to_decision"])] + list(results["stages"].items()):
+        print(f"{stage:<16} {summary['count']:>6} {summary['p50_ms']:>9.1f} {summary['p95_ms']:>9.1f} "
+              f"{summary['p99_ms']:>9.1f}")
+    print(f"inference {results['throughput']['inference_fps']:.1f} fps, "
+          f"{results['throughput']['inference_errors']} errors, "
+          f"{results['throughput']['camera_dropped']} camera frames dropped")
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                         f"replay-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark detection post-processing: per-box Python loop vs postprocess.py.
+
+    python benchmarks/bench_postprocess.py --boxes 5000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from postprocess import postprocess  # noqa: E402
+
+CLASSES = ["hardhat", "vest", "gloves", "shoes"]
+
+
+def make_predictions(count, seed=0):
+    """Random boxes with clusters of near-duplicates, like a detector without NMS produces."""
+    rng = random.Random(seed)
+    predictions = []
+    while len(predictions) < count:
+        cx, cy = rng.uniform(0, 3000), rng.uniform(0, 4000)
+        w, h = rng.uniform(50, 600), rng.uniform(50, 600)
+        name = rng.choice(CLASSES)
+        for _ in range(rng.randint(1, 4)):
+            predictions.append({
+                "x": cx + rng.uniform(-10, 10), "y": cy + rng.uniform(-10, 10),
+                "width": w * rng.uniform(0.9, 1.1), "height": h * rng.uniform(0.9, 1.1),
+                "confidence": rng.random(), "class": name,
+            })
+    return predictions[:count]
+
+
+def python_loop(predictions, threshold=0.5, iou_threshold=0.5):
+    """Per-box loop in the style of the original app code, plus a naive greedy NMS."""
+    boxes = []
+    for pred in predictions:
+        if pred["confidence"] > threshold:
+            x0 = pred["x"] - pred["width"] / 2
+            y0 = pred["y"] - pred["height"] / 2
+            boxes.append((pred["confidence"], pred["class"], x0, y0, x0 + pred["width"], y0 + pred["height"]))
+    boxes.sort(reverse=True)
+    kept = []
+    for box in boxes:
+        duplicate = False
+        for other in kept:
+            if other[1] != box[1]:
+                continue
+            w = min(box[4], other[4]) - max(box[2], other[2])
+            h = min(box[5], other[5]) - max(box[3], other[3])
+            if w <= 0 or h <= 0:
+                continue
+            inter = w * h
+            union = (box[4] - box[2]) * (box[5] - box[3]) + (other[4] - other[2]) * (other[5] - other[3]) - inter
+            if inter / union > iou_threshold:
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(box)
+    return kept
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--boxes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'boxes':>7} {'kept':>6} {'python ms':>10} {'numpy ms':>10} {'speedup':>8}")
+    for count in args.boxes:
+        predictions = make_predictions(count)
+        loop_time, loop_kept = timed(lambda: python_loop(predictions), args.repeat)
+        numpy_time, detections = timed(
+            lambda: postprocess(predictions, thresholds={"default": 0.5}, iou_threshold=0.5), args.repeat)
+        if len(loop_kept) != len(detections):
+            print(f"⚠️ kept count differs: python {len(loop_kept)} vs numpy {len(detections)}")
+        print(f"{count:>7} {len(detections):>6} {loop_time * 1000:>10.2f} {numpy_time * 1000:>10.2f} "
+              f"{loop_time / numpy_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
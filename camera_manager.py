@@ -0,0 +1,176 @@
+import time
+import threading
+from collections import deque
+
+import cv2
+
+import config
+import metrics
+
+
+class CameraStream:
+    """One camera kept open and read on its own thread into a small ring buffer.
+
+    Consumers never touch the VideoCapture: they take the newest frame with latest()
+    (non-blocking) or wait for the next one with wait_for_frame(). A video file path
+    works as an index too; it is played at its own frame rate and loops at the end.
+    """
+
+    def __init__(self, index, buffer_size=config.CAMERA_BUFFER_SIZE, reopen_delay=config.CAMERA_REOPEN_DELAY):
+        self.index = index
+        self.reopen_delay = reopen_delay
+        self.buffer = deque(maxlen=buffer_size)
+        self.condition = threading.Condition()
+        self.seq = 0
+        self.last_read_seq = 0
+        self.frames = 0
+        self.dropped = 0
+        self.read_errors = 0
+        self.fps = 0.0
+        self.running = False
+        self.capture = None
+        self.thread = None
+        self.frame_interval = 0.0
+
+    def start(self):
+        if self.running:
+            return self
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=f"camera-{self.index}", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+
+    def _open(self):
+        with metrics.span("camera_open", camera=self.index):
+            self.capture = cv2.VideoCapture(self.index)
+        if not self.capture.isOpened():
+            print(f"⚠️ Camera {self.index} could not be opened, retrying in {self.reopen_delay}s")
+            self.capture.release()
+            self.capture = None
+            return
+        if isinstance(self.index, str):
+            fps = self.capture.get(cv2.CAP_PROP_FPS)
+            self.frame_interval = 1.0 / fps if fps > 0 else 0.0
+
+    def _run(self):
+        window_start = time.monotonic()
+        window_frames = 0
+        next_frame = 0.0
+        while self.running:
+            if self.capture is None:
+                self._open()
+                if self.capture is None:
+                    time.sleep(self.reopen_delay)
+                    continue
+            if self.frame_interval:
+                next_frame = max(next_frame + self.frame_interval, time.monotonic())
+                time.sleep(max(0.0, next_frame - time.monotonic()))
+            ret, frame = self.capture.read()
+            if not ret:
+                self.read_errors += 1
+                metrics.inc("camera_read_errors", camera=self.index)
+                self.capture.release()
+                self.capture = None
+                time.sleep(self.reopen_delay)
+                continue
+            with self.condition:
+                # A full buffer overwrites its oldest frame; count it if nobody ever saw it
+                if len(self.buffer) == self.buffer.maxlen and self.buffer[0][0] > self.last_read_seq:
+                    self.dropped += 1
+                self.seq += 1
+                self.buffer.append((self.seq, time.time(), frame))
+                self.frames += 1
+                self.condition.notify_all()
+            window_frames += 1
+            now = time.monotonic()
+            if now - window_start >= 1.0:
+                self.fps = window_frames / (now - window_start)
+                window_start = now
+                window_frames = 0
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+    def latest(self):
+        """Return (seq, frame) for the newest frame, or (0, None) if none yet. Never blocks on the camera."""
+        with self.condition:
+            if not self.buffer:
+                return 0, None
+            seq, _, frame = self.buffer[-1]
+            self.last_read_seq = max(self.last_read_seq, seq)
+            return seq, frame
+
+    def recent(self):
+        """Return every buffered (seq, timestamp, frame), oldest first."""
+        with self.condition:
+            items = list(self.buffer)
+            if items:
+                self.last_read_seq = max(self.last_read_seq, items[-1][0])
+            return items
+
+    def wait_for_frame(self, after_seq=0, timeout=1.0):
+        """Block (worker threads only) until a frame newer than after_seq arrives."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.seq > after_seq, timeout=timeout)
+        return self.latest()
+
+    def stats(self):
+        return {
+            "index": self.index,
+            "open": self.capture is not None,
+            "fps": round(self.fps, 1),
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "read_errors": self.read_errors,
+        }
+
+
+class CameraManager:
+    def __init__(self):
+        self.streams = {}
+        self.lock = threading.Lock()
+        for key in ("fps", "frames", "dropped"):
+            metrics.register_gauge(f"camera_{key}", lambda key=key: {
+                index: stats[key] for index, stats in self.stats().items()}, label="camera")
+
+    def get(self, index):
+        """Return the running stream for a camera index, opening it on first use."""
+        with self.lock:
+            stream = self.streams.get(index)
+            if stream is None:
+                stream = self.streams[index] = CameraStream(index).start()
+            return stream
+
+    def open_all(self, indexes):
+        for index in indexes:
+            self.get(index)
+
+    def stats(self):
+        with self.lock:
+            return {index: stream.stats() for index, stream in self.streams.items()}
+
+    def release_all(self):
+        with self.lock:
+            streams = list(self.streams.values())
+            self.streams.clear()
+        for stream in streams:
+            stream.stop()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_camera_manager():
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = CameraManager()
+    return _manager
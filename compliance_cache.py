@@ -0,0 +1,96 @@
+import time
+import threading
+from collections import OrderedDict
+
+import config
+import metrics
+
+
+class ComplianceCache:
+    """Recent complete-PPE results keyed by scanned ID, so a worker badging back in skips the full check.
+
+    Only compliant results are stored. An entry is valid for ttl seconds after the check
+    that produced it; at most max_size IDs are kept and the least recently used one is
+    evicted first. Shared by every lane: a worker may leave through one gate and come
+    back through another. A hit is never trusted on its own; the gate still confirms it
+    on one fresh frame.
+    """
+
+    def __init__(self, enabled=config.COMPLIANCE_CACHE, ttl=config.COMPLIANCE_CACHE_TTL,
+                 max_size=config.COMPLIANCE_CACHE_SIZE, clock=time.monotonic):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.counts = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidated": 0}
+        self.lock = threading.Lock()
+        metrics.register_gauge("compliance_cache_size", lambda: len(self.entries))
+
+    def lookup(self, id_number):
+        """Return ("hit", flags), ("miss", None) or ("expired", None); (None, None) when disabled."""
+        if not self.enabled or id_number is None:
+            return None, None
+        now = self.clock()
+        with self.lock:
+            entry = self.entries.get(id_number)
+            if entry is None:
+                outcome = "miss"
+            elif now - entry[1] > self.ttl:
+                del self.entries[id_number]
+                outcome = "expired"
+            else:
+                self.entries.move_to_end(id_number)
+                outcome = "hit"
+            self.counts["hits" if outcome == "hit" else "misses"] += 1
+            if outcome == "expired":
+                self.counts["expired"] += 1
+        metrics.inc("compliance_cache", result=outcome)
+        return outcome, (dict(entry[0]) if outcome == "hit" else None)
+
+    def put(self, id_number, flags):
+        """Store a compliant result (anything else drops the ID). Returns the number of entries evicted."""
+        if not self.enabled or id_number is None:
+            return 0
+        if not all(flags.values()):
+            self.invalidate(id_number)
+            return 0
+        evicted = 0
+        with self.lock:
+            self.entries[id_number] = (dict(flags), self.clock())
+            self.entries.move_to_end(id_number)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                evicted += 1
+            self.counts["evictions"] += evicted
+        if evicted:
+            metrics.inc("compliance_cache_evictions", evicted)
+        return evicted
+
+    def invalidate(self, id_number):
+        with self.lock:
+            if self.entries.pop(id_number, None) is not None:
+                self.counts["invalidated"] += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.counts["hits"] + self.counts["misses"]
+            return dict(self.counts, size=len(self.entries),
+                        hit_rate=self.counts["hits"] / lookups if lookups else 0.0)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_compliance_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ComplianceCache()
+    return _cache
@@ -0,0 +1,243 @@
+import os
+
+# --- Inference Backend ---
+# "remote"   -> Roboflow serverless HTTP API
+# "local"    -> exported model (ONNX) running in-process on the CPU
+# "fallback" -> remote first, local when the remote is slow or down
+INFERENCE_BACKEND = os.environ.get("PPE_INFERENCE_BACKEND", "fallback")
+
+ROBOFLOW_API_URL = "https://serverless.roboflow.com"
+ROBOFLOW_API_KEY = os.environ.get("ROBOFLOW_API_KEY", "ipRXafHM2fxthdHpXUSC")
+
+# --- Model Registry ---
+# Every model version we run, by name; "local_path" is its ONNX export for the local backend
+MODELS = {
+    "v3": {"id": "ppe-ukjvg/3", "local_path": "models/ppe-ukjvg-3.onnx",
+           "classes": ["gloves", "hardhat", "shoes", "vest"]},
+    "v2": {"id": "ppe-ukjvg/2"},
+}
+# The version the gate decides with (switch without code changes: PPE_MODEL=v2)
+ACTIVE_MODEL = os.environ.get("PPE_MODEL", "v3")
+MODEL_ID = MODELS[ACTIVE_MODEL]["id"]
+
+# Exported copy of MODEL_ID (YOLOv8 ONNX export from Roboflow/ultralytics). None when the active model has
+# no export of its own: the local backend is then unavailable, never another version's export in its place
+LOCAL_MODEL_PATH = os.environ.get("PPE_LOCAL_MODEL") or MODELS[ACTIVE_MODEL].get("local_path")
+LOCAL_MODEL_CLASSES = MODELS[ACTIVE_MODEL].get("classes")
+LOCAL_MODEL_INPUT_SIZE = 640
+LOCAL_CONFIDENCE = 0.25
+LOCAL_IOU = 0.45
+
+# Seconds to wait for the remote backend before switching to the local one
+REMOTE_TIMEOUT = 3.0
+# Seconds to stay on the local backend after a remote failure
+REMOTE_RETRY_AFTER = 30.0
+
+# --- Shared Inference Client ---
+INFERENCE_CONNECT_TIMEOUT = 3.05
+INFERENCE_READ_TIMEOUT = 10.0
+INFERENCE_RETRIES = 2
+# Seconds before the first retry, doubled on every further attempt
+INFERENCE_BACKOFF = 0.5
+HTTP_POOL_SIZE = 4
+# Ping the API this often so the pooled TLS connection is not dropped between gate checks (0 = off)
+INFERENCE_KEEPALIVE_INTERVAL = 30.0
+
+# --- Frame Encoding ---
+# Frames go to the detector straight from memory, downscaled so the longest side is at most this (0 = full size)
+INFERENCE_MAX_SIDE = 1024
+INFERENCE_JPEG_QUALITY = 85
+# Only the annotated result is ever written to disk, and only when enabled
+SAVE_ANNOTATED_RESULT = True
+ANNOTATED_RESULT_PATH = "annotated_ppe_result.jpg"
+ANNOTATED_RESULT_QUALITY = 90  # JPEG quality; for a .png path, higher means less compression
+
+# --- Annotation ---
+# Tried in order; PIL also looks them up in the system font folders
+ANNOTATION_FONTS = ("DejaVuSans-Bold.ttf", "arial.ttf", "LiberationSans-Bold.ttf")
+ANNOTATION_FONT_SIZE = 22
+ANNOTATION_THICKNESS = 3
+
+# --- Preview ---
+# Per-screen preview transform: rotation (None, "cw", "ccw" or "180") and the largest
+# display size (w, h) frames are shrunk to before upload; None keeps camera resolution
+PREVIEW_QR = {"rotate": None, "display_size": (800, 480)}
+PREVIEW_PPE = {"rotate": "ccw", "display_size": (480, 800)}
+
+# --- Gate Lanes ---
+# One entry per turnstile served by this box: its QR front/back and PPE camera indexes
+# and its Firebase flag paths (a second lane could use "/lane2/front", ...)
+LANES = [
+    {"name": "gate-1", "qr_front": 1, "qr_back": 0, "ppe": 2,
+     "front_path": "/front", "back_path": "/back", "door_status_path": "/door_status"},
+]
+# Inference workers shared by all lanes, and pending calls kept per lane (oldest dropped first)
+LANE_INFERENCE_WORKERS = 2
+LANE_QUEUE_DEPTH = 2
+# Seconds between per-lane latency log lines
+LANE_STATS_INTERVAL = 60
+
+# --- Cameras ---
+# Frames kept per camera; consumers only ever look at the newest few
+CAMERA_BUFFER_SIZE = 4
+CAMERA_REOPEN_DELAY = 2.0
+
+# --- QR Decoding ---
+QR_DECODE_WORKERS = 1
+# Decode every Nth preview frame
+QR_DECODE_EVERY = 2
+# Tried in order until one finds a code: centre crop, downscaled grayscale, full resolution
+QR_DECODE_MODES = ("roi", "downscale", "full")
+QR_ROI_FRACTION = 0.6
+QR_DOWNSCALE_WIDTH = 640
+QR_QUEUE_SIZE = 2
+
+# --- Gate Triggers ---
+# "firebase" -> stream /front and /back, "fake" -> in-process source for tests/headless runs
+TRIGGER_SOURCE = os.environ.get("PPE_TRIGGER_SOURCE", "firebase")
+
+# --- Firebase ---
+FIREBASE_CREDENTIALS = "ode-project-734d6-firebase-adminsdk-fbsvc-5699f7abc3.json"
+FIREBASE_DATABASE_URL = "https://ode-project-734d6-default-rtdb.asia-southeast1.firebasedatabase.app/"
+
+# --- Firebase Writes ---
+# Writes are queued and sent as batched multi-path updates; while offline they go to this journal
+FIREBASE_JOURNAL_PATH = "firebase_journal.jsonl"
+FIREBASE_BATCH_SIZE = 100
+# Seconds to wait for more writes from the same gate event before flushing
+FIREBASE_FLUSH_INTERVAL = 0.05
+FIREBASE_RETRY_INTERVAL = 5.0
+# Writes Firebase refuses for good (illegal key, invalid value, permission) are logged here instead of retried
+FIREBASE_REJECTED_PATH = "firebase_rejected.jsonl"
+
+# --- Attendance Store ---
+ATTENDANCE_DB_PATH = "attendance.db"
+# Firebase node the local log is mirrored to
+ATTENDANCE_FIREBASE_PATH = "DWS-In-Out"
+ATTENDANCE_SYNC_INTERVAL = 10.0
+
+# --- Detection Post-processing ---
+# Per-class confidence thresholds ("default" for anything not listed)
+CONFIDENCE_THRESHOLDS = {"default": 0.5}
+# Class-aware NMS IoU threshold (1.0 disables de-duplication)
+NMS_IOU = 0.5
+
+# --- PPE Check ---
+# "stream"    -> infer continuously and grant access as soon as the window is compliant
+# "countdown" -> 10 s countdown, then a single snapshot
+PPE_CHECK_MODE = "stream"
+# Frames per second sent to the detector in stream mode
+STREAM_INFER_FPS = 4
+# Sliding window of inferred frames, and how many of them must contain each PPE class
+STREAM_WINDOW = 5
+STREAM_MIN_HITS = 2
+# Record a failed check and start a fresh window after this many seconds without compliance
+STREAM_TIMEOUT = 15.0
+
+# --- Evaluation ---
+EVAL_CLASSES = ("hardhat", "vest", "gloves", "shoes")
+EVAL_IOU_THRESHOLDS = (0.5, 0.75)
+# VOC label -> class name used by the app, for datasets labelled with other names
+VOC_CLASS_ALIASES = {"helmet": "hardhat", "glove": "gloves", "safety_vest": "vest"}
+# Parse in a process pool only when at least this many XML files changed
+VOC_PARALLEL_MIN_FILES = 200
+
+# --- Evaluation Runner ---
+# Offline runs use one explicit backend ("remote" or "local") so cached predictions stay comparable
+EVAL_BACKEND = "remote"
+EVAL_WORKERS = 4
+PREDICTION_CACHE_PATH = "prediction_cache.db"
+# Least recently used predictions are evicted above this many bytes of stored JSON
+PREDICTION_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# --- Gate Engine ---
+# Seconds for each timed step of a gate session
+GATE_QR_COUNTDOWN = 5
+GATE_PPE_COUNTDOWN = 10
+# "Access Granted" message before the result screen, "Incomplete PPE" before the next countdown
+GATE_GRANTED_DELAY = 2
+GATE_RETRY_DELAY = 5
+# Result screen before /front is reset and the lane goes idle
+GATE_RESULT_SECONDS = 10
+# Engine loop period while it polls the QR camera
+GATE_TICK = 1.0 / 30.0
+# Also set /door_status to 1 when the PPE check passes (app_test_version.py turns this on)
+DOOR_OPEN_ON_PPE_PASS = False
+
+# --- Metrics ---
+# Prometheus /metrics endpoint (port 0 disables it)
+METRICS_PORT = 9108
+METRICS_HOST = "127.0.0.1"
+METRICS_PREFIX = "ppe_gate"
+# Recent observations kept per stage for the p50/p95/p99 quantiles
+METRICS_WINDOW = 1024
+# One JSON log line per gate event and per span slower than METRICS_SLOW_SPAN_MS (0 = never)
+METRICS_STRUCTURED_LOGS = False
+METRICS_SLOW_SPAN_MS = 1000
+
+# --- Startup ---
+STARTUP_CAMERA_TIMEOUT = 10  # seconds to wait for each camera's first frame during boot
+STARTUP_LOG_PATH = "boot_times.jsonl"  # one JSON line per boot; "" to disable
+
+# --- Frame Quality ---
+# Score the PPE camera's buffered frames and only send the best acceptable one to the detector
+QUALITY_GATE = True
+QUALITY_THUMB_WIDTH = 320  # frames are scored on a grayscale thumbnail this wide
+QUALITY_MIN_SHARPNESS = 60.0  # Laplacian variance of the thumbnail
+QUALITY_BRIGHTNESS = (40, 220)  # acceptable mean gray level
+QUALITY_MAX_CLIPPED = 0.25  # max fraction of pixels crushed to black (<16) or blown out (>=240)
+QUALITY_MAX_MOTION = 25.0  # mean abs difference to the previous frame; above it the subject is moving
+QUALITY_MIN_PRESENCE = 6.0  # mean abs difference to the empty-scene snapshot taken at the front trigger
+# Countdown mode: re-check this often, this many times, before falling back to a new countdown
+QUALITY_RETRY_DELAY = 0.5
+QUALITY_RETRIES = 3
+
+# --- Person Tracking ---
+# Attribute PPE boxes to people and decide on the person nearest the gate (False: whole frame as one group)
+PPE_TRACKING = True
+# Model class for whole-person boxes; the PPE model has none, so regions are estimated from TRACK_BODY_RATIOS
+TRACK_PERSON_CLASS = "person"
+# Anchor class -> (left, top, right, bottom) growth in multiples of the anchor box's width/height,
+# tried in order: a vest covers the torso, a hardhat (worker without a vest) the head
+TRACK_BODY_RATIOS = {"vest": (0.6, 0.9, 0.6, 1.0), "hardhat": (1.5, 0.3, 1.5, 6.0)}
+TRACK_MIN_CONTAINMENT = 0.5  # share of a PPE box's area that must fall inside a person's region
+TRACK_IOU = 0.3  # match a person to a track at this IoU...
+TRACK_MAX_DISTANCE = 0.5  # ...or by centre distance, in multiples of the person's region diagonal
+TRACK_MAX_AGE = 2.0  # seconds a track survives without being seen
+# No inference runs between one check and the next scan, so a passed track is judged live against
+# the gate's own timings (result to the earliest next PPE check), with TRACK_MAX_AGE of slack
+TRACK_IDLE_TTL = GATE_GRANTED_DELAY + GATE_RESULT_SECONDS + GATE_QR_COUNTDOWN + TRACK_MAX_AGE
+TRACK_GATE_POINT = (0.5, 0.5)  # where the worker at the gate stands, as a fraction of the PPE frame (x, y)
+TRACK_COMPLIANCE_TTL = 30.0  # seconds a compliant track's result is reused without new inference (> TRACK_IDLE_TTL)
+
+# --- Compliance Cache ---
+# Remember complete-PPE results per scanned ID, so a worker badging back in soon after a passed check
+# is confirmed on one frame instead of the full countdown/stream check (False: every entry is fully checked)
+COMPLIANCE_CACHE = True
+COMPLIANCE_CACHE_TTL = 300.0  # seconds a passed check stays valid
+COMPLIANCE_CACHE_SIZE = 256  # IDs kept; the least recently used is evicted first
+COMPLIANCE_CONFIRM_DELAY = 1.0  # seconds for the worker to step in front of the PPE camera before the confirmation frame
+
+# --- Audio Prompts ---
+AUDIO_BACKEND = "pygame"  # "null" for silent, headless runs; also used when pygame cannot open a sound device
+AUDIO_DIR = "voices"  # every clip here is decoded into memory at startup
+AUDIO_VOLUME = 1.0
+# Gate event -> clip in AUDIO_DIR; a prompt without a clip is skipped
+AUDIO_PROMPTS = {
+    "countdown": "1.mp3",       # QR countdown started
+    "scan_accepted": "2.mp3",   # QR code read
+    "ppe_incomplete": "3.mp3",  # PPE check failed, retrying
+    "access_granted": "4.mp3",  # PPE check passed
+}
+# A prompt interrupts a playing one of the same or lower priority
+AUDIO_PRIORITIES = {"countdown": 1, "scan_accepted": 2, "ppe_incomplete": 3, "access_granted": 3}
+AUDIO_MAX_AGE = 3.0  # seconds a queued prompt may wait for a higher-priority one before it is dropped as stale
+
+# --- Shadow Mode ---
+# Registry name of a candidate model to compare against ACTIVE_MODEL on live PPE frames (None = off).
+# The candidate never affects the gate decision.
+SHADOW_MODEL = os.environ.get("PPE_SHADOW_MODEL") or None
+SHADOW_SAMPLE_RATE = 0.1  # fraction of PPE frames also sent to the candidate
+SHADOW_BACKEND = "remote"  # the local backend serves a single exported model
+SHADOW_QUEUE_SIZE = 4  # pending shadow calls; further samples are dropped, never waited for
+SHADOW_DB_PATH = "shadow.db"
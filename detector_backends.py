@@ -0,0 +1,279 @@
+import os
+import time
+import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import config
+import metrics
+from model_registry import model_name
+
+# Every backend returns the Roboflow response shape:
+#   {"predictions": [{"class", "class_id", "confidence", "x", "y", "width", "height"}, ...]}
+# with x/y being the box centre in pixels of the image that was passed in.
+
+
+class DetectorBackend:
+    name = "base"
+
+    def infer(self, image, model_id=None):
+        """Run detection on a BGR numpy frame, encoded image bytes or an image path."""
+        raise NotImplementedError
+
+    def warm_up(self):
+        pass
+
+    def ping(self):
+        """Keep any remote connection alive; cheap, called periodically."""
+        pass
+
+
+def encode_frame(frame, max_side=config.INFERENCE_MAX_SIDE, quality=config.INFERENCE_JPEG_QUALITY):
+    """JPEG-encode a BGR frame in memory, downscaled to max_side. Returns (bytes, scale)."""
+    import cv2
+    with metrics.span("encode_frame"):
+        h, w = frame.shape[:2]
+        scale = 1.0
+        if max_side and max(h, w) > max_side:
+            scale = max_side / max(h, w)
+            frame = cv2.resize(frame, (int(round(w * scale)), int(round(h * scale))), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ok:
+        raise ValueError("Could not encode frame")
+    return buf.tobytes(), scale
+
+
+def rescale_predictions(result, scale):
+    """Map predictions made on a downscaled image back to the original frame."""
+    if scale == 1.0:
+        return result
+    for pred in result.get("predictions", []):
+        for key in ("x", "y", "width", "height"):
+            pred[key] = pred[key] / scale
+    if "image" in result:
+        result["image"] = {
+            "width": int(round(result["image"]["width"] / scale)),
+            "height": int(round(result["image"]["height"] / scale)),
+        }
+    return result
+
+
+def create_http_session(pool_size=config.HTTP_POOL_SIZE):
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class RoboflowHTTPBackend(DetectorBackend):
+    """Roboflow serverless API over a pooled keep-alive session.
+
+    Speaks the same protocol as InferenceHTTPClient.infer for hosted models, but reuses
+    connections instead of paying DNS + TLS setup on every gate check.
+    """
+    name = "remote"
+
+    def __init__(self, api_url=config.ROBOFLOW_API_URL, api_key=config.ROBOFLOW_API_KEY,
+                 model_id=config.MODEL_ID, session=None,
+                 timeout=(config.INFERENCE_CONNECT_TIMEOUT, config.INFERENCE_READ_TIMEOUT)):
+        self.api_url = api_url.rstrip("/")
+        self.api_key = api_key
+        self.model_id = model_id
+        self.session = session or create_http_session()
+        self.timeout = timeout
+
+    def _encode(self, image):
+        if isinstance(image, (bytes, bytearray)):
+            return base64.b64encode(image), 1.0
+        if isinstance(image, str):
+            with open(image, "rb") as f:
+                return base64.b64encode(f.read()), 1.0
+        data, scale = encode_frame(image)
+        return base64.b64encode(data), scale
+
+    def infer(self, image, model_id=None):
+        data, scale = self._encode(image)
+        response = self.session.post(
+            f"{self.api_url}/{model_id or self.model_id}",
+            params={"api_key": self.api_key},
+            data=data,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return rescale_predictions(response.json(), scale)
+
+    def warm_up(self):
+        self.ping()
+
+    def ping(self):
+        # Any response will do, the point is to leave a resolved, TLS-established connection in the pool
+        self.session.head(self.api_url, timeout=self.timeout)
+
+
+class LocalONNXBackend(DetectorBackend):
+    name = "local"
+
+    def __init__(self, model_path=config.LOCAL_MODEL_PATH, class_names=config.LOCAL_MODEL_CLASSES,
+                 input_size=config.LOCAL_MODEL_INPUT_SIZE, confidence=config.LOCAL_CONFIDENCE,
+                 iou=config.LOCAL_IOU, model_id=config.MODEL_ID):
+        if not model_path or not class_names:
+            raise ValueError(f"{model_name(model_id)} ({model_id}) has no local export; "
+                             f"add its local_path and classes to config.MODELS")
+        import onnxruntime as ort
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Local model not found: {model_path}")
+        self.session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.model_id = model_id
+        self.class_names = class_names
+        self.input_size = input_size
+        self.confidence = confidence
+        self.iou = iou
+        # onnxruntime sessions are safe to share, but keep one inference at a time on the Pi CPU
+        self.lock = threading.Lock()
+
+    @classmethod
+    def for_model(cls, model_id=config.MODEL_ID, **kwargs):
+        """Backend running model_id's own export (ValueError when the registry has none)."""
+        if model_id == config.MODEL_ID:
+            path, classes = config.LOCAL_MODEL_PATH, config.LOCAL_MODEL_CLASSES
+        else:
+            entry = config.MODELS.get(model_name(model_id), {})
+            path, classes = entry.get("local_path"), entry.get("classes")
+        return cls(path, classes, model_id=model_id, **kwargs)
+
+    def _load(self, image):
+        import cv2
+        import numpy as np
+        if isinstance(image, (bytes, bytearray)):
+            return cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if isinstance(image, str):
+            frame = cv2.imread(image)
+            if frame is None:
+                raise ValueError(f"Could not read image: {image}")
+            return frame
+        return image
+
+    def _letterbox(self, frame):
+        import cv2
+        import numpy as np
+        h, w = frame.shape[:2]
+        scale = min(self.input_size / w, self.input_size / h)
+        new_w, new_h = int(round(w * scale)), int(round(h * scale))
+        resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        pad_x = (self.input_size - new_w) // 2
+        pad_y = (self.input_size - new_h) // 2
+        canvas = np.full((self.input_size, self.input_size, 3), 114, dtype=np.uint8)
+        canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = resized
+        blob = cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)[None]
+        return blob.astype(np.float32) / 255.0, scale, pad_x, pad_y
+
+    def infer(self, image, model_id=None):
+        # One export per backend: answering for another model id would mislabel its results
+        if model_id and model_id != self.model_id:
+            raise ValueError(f"Local backend runs {self.model_id}, not {model_id}")
+        import cv2
+        import numpy as np
+        frame = self._load(image)
+        blob, scale, pad_x, pad_y = self._letterbox(frame)
+        with self.lock:
+            output = self.session.run(None, {self.input_name: blob})[0]
+
+        # YOLOv8 export: (1, 4 + num_classes, num_anchors) -> (num_anchors, 4 + num_classes)
+        rows = output[0].T
+        class_scores = rows[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(rows)), class_ids]
+        keep = scores > self.confidence
+        rows, class_ids, scores = rows[keep], class_ids[keep], scores[keep]
+
+        cx = (rows[:, 0] - pad_x) / scale
+        cy = (rows[:, 1] - pad_y) / scale
+        bw = rows[:, 2] / scale
+        bh = rows[:, 3] / scale
+        boxes = np.stack([cx - bw / 2, cy - bh / 2, bw, bh], axis=1)
+        indices = cv2.dnn.NMSBoxesBatched(boxes.tolist(), scores.tolist(), class_ids.tolist(),
+                                          self.confidence, self.iou) if len(rows) else []
+
+        predictions = []
+        for i in np.array(indices).flatten():
+            class_id = int(class_ids[i])
+            predictions.append({
+                "x": float(cx[i]),
+                "y": float(cy[i]),
+                "width": float(bw[i]),
+                "height": float(bh[i]),
+                "confidence": float(scores[i]),
+                "class": self.class_names[class_id],
+                "class_id": class_id,
+            })
+        return {
+            "image": {"width": frame.shape[1], "height": frame.shape[0]},
+            "predictions": predictions,
+        }
+
+    def warm_up(self):
+        import numpy as np
+        self.infer(np.zeros((self.input_size, self.input_size, 3), dtype=np.uint8))
+
+
+class FallbackBackend(DetectorBackend):
+    """Use the primary backend, switching to the secondary when it is slow or failing."""
+    name = "fallback"
+
+    def __init__(self, primary, secondary, timeout=config.REMOTE_TIMEOUT,
+                 retry_after=config.REMOTE_RETRY_AFTER):
+        self.primary = primary
+        self.secondary = secondary
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.primary_down_until = 0.0
+        # A hung remote call keeps its worker busy, so allow a spare one
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="remote-infer")
+
+    def infer(self, image, model_id=None):
+        if model_id and model_id != self.secondary.model_id:
+            # The local export is the active model's; another version is remote only, never answered by it
+            return self.primary.infer(image, model_id)
+        if time.monotonic() >= self.primary_down_until:
+            future = self.executor.submit(self.primary.infer, image, model_id)
+            try:
+                return future.result(timeout=self.timeout)
+            except FutureTimeout:
+                print(f"⚠️ {self.primary.name} inference took longer than {self.timeout}s, "
+                      f"using {self.secondary.name}")
+            except Exception as e:
+                print(f"⚠️ {self.primary.name} inference failed ({e}), using {self.secondary.name}")
+            self.primary_down_until = time.monotonic() + self.retry_after
+        return self.secondary.infer(image, model_id)
+
+    def warm_up(self):
+        try:
+            self.primary.warm_up()
+        except Exception as e:
+            print(f"⚠️ {self.primary.name} warm-up failed: {e}")
+        self.secondary.warm_up()
+
+    def ping(self):
+        self.primary.ping()
+
+
+def create_backend(kind=None, model_id=config.MODEL_ID, session=None):
+    kind = kind or config.INFERENCE_BACKEND
+    if kind == "remote":
+        return RoboflowHTTPBackend(model_id=model_id, session=session)
+    if kind == "local":
+        return LocalONNXBackend.for_model(model_id)
+    if kind == "fallback":
+        remote = RoboflowHTTPBackend(model_id=model_id, session=session)
+        try:
+            local = LocalONNXBackend.for_model(model_id)
+        except Exception as e:
+            print(f"⚠️ Local backend unavailable ({e}); running remote only, with no fallback when it is down")
+            return remote
+        return FallbackBackend(remote, local)
+    raise ValueError(f"Unknown inference backend: {kind}")
@@ -0,0 +1,210 @@
+"""Offline evaluation: run each model once per image, cache predictions, report metrics.
+
+    python eval_runner.py --images all --model v3 --model v2 --workers 4    # names from config.MODELS, or raw ids
+"""
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import model_registry
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    image_hash TEXT NOT NULL,
+    model_id TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    result TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (image_hash, model_id, backend)
+);
+CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions (last_used);
+"""
+
+
+def image_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """Raw detector responses keyed by (image content hash, model id, backend).
+
+    Bounded to max_bytes of stored JSON; the least recently used entries are evicted first.
+    """
+
+    def __init__(self, path=config.PREDICTION_CACHE_PATH, max_bytes=config.PREDICTION_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT result FROM predictions WHERE image_hash = ? AND model_id = ? AND backend = ?", key).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE predictions SET last_used = ? WHERE image_hash = ? AND model_id = ? AND backend = ?",
+                    (time.time(), *key))
+            return json.loads(row[0])
+
+    def put(self, key, result):
+        data = json.dumps(result)
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?, ?, ?)", (*key, data, len(data), now, now))
+            self._evict()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM predictions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for image, model_id, backend, size in self.conn.execute(
+                "SELECT image_hash, model_id, backend, size FROM predictions ORDER BY last_used"):
+            victims.append((image, model_id, backend))
+            freed += size
+            if freed >= excess:
+                break
+        self.conn.executemany(
+            "DELETE FROM predictions WHERE image_hash = ? AND model_id = ? AND backend = ?", victims)
+        self.evictions += len(victims)
+
+
+class EvaluationRunner:
+    """Fills the prediction cache for a set of images and models with a worker pool."""
+
+    def __init__(self, backend=config.EVAL_BACKEND, cache=None, workers=config.EVAL_WORKERS):
+        self.backend = backend
+        self.cache = cache or PredictionCache()
+        self.workers = workers
+        self._clients = {}
+        self._client_lock = threading.Lock()
+
+    def client(self, model_id):
+        """Remote: one client for every model. Local: one per model, each running that model's own export."""
+        key = model_id if self.backend == "local" else None
+        with self._client_lock:
+            if key not in self._clients:
+                from inference_client import InferenceClient
+                self._clients[key] = InferenceClient(kind=self.backend, model_id=model_id)
+            return self._clients[key]
+
+    def predict(self, image_path, model_id=config.MODEL_ID):
+        """Cached detector response for one image file."""
+        key = (image_hash(image_path), model_id, self.backend)
+        result = self.cache.get(key)
+        if result is None:
+            with open(image_path, "rb") as f:
+                result = self.client(model_id).infer(f.read(), model_id)
+            self.cache.put(key, result)
+        return result
+
+    def run(self, image_paths, model_ids):
+        """Predict every (image, model) pair; returns {model_id: {image_path: response}}."""
+        jobs = [(path, model_id) for model_id in model_ids for path in image_paths]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(lambda job: self.predict(*job), jobs))
+        out = {model_id: {} for model_id in model_ids}
+        for (path, model_id), result in zip(jobs, results):
+            out[model_id][path] = result
+        return out
+
+
+def list_images(folder):
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                  if name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+_runner = None
+
+
+def cached_predict(image_path, model_id=config.MODEL_ID):
+    """Cached prediction for notebooks and scripts, sharing one runner and cache."""
+    global _runner
+    if _runner is None:
+        _runner = EvaluationRunner()
+    return _runner.predict(image_path, model_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", default="all", help="folder with images")
+    parser.add_argument("--annotations", help="folder with Pascal VOC XML files (defaults to --images)")
+    parser.add_argument("--model", action="append", dest="models", help="registry name or model id, repeat to compare versions")
+    parser.add_argument("--backend", choices=["remote", "local"], default=config.EVAL_BACKEND)
+    parser.add_argument("--workers", type=int, default=config.EVAL_WORKERS)
+    parser.add_argument("--method", choices=["greedy", "hungarian"], default="greedy")
+    parser.add_argument("--output", help="write the metrics of every model to this JSON file")
+    args = parser.parse_args()
+
+    from postprocess import postprocess
+    from evaluation import Evaluator
+    from voc_dataset import VOCDataset
+
+    models = [model_registry.model_id(name) for name in args.models] if args.models else [config.MODEL_ID]
+    dataset = VOCDataset(args.annotations or args.images)
+    images = [path for path in list_images(args.images) if _has_annotation(dataset, path)]
+    if not images:
+        print(f"⚠️ No annotated images in {args.images}")
+        return
+
+    runner = EvaluationRunner(backend=args.backend, workers=args.workers)
+    start = time.time()
+    predictions = runner.run(images, models)
+    cache = runner.cache
+    print(f"🔁 {len(images)} images x {len(models)} models in {time.time() - start:.1f}s "
+          f"(cache hits {cache.hits}, misses {cache.misses}, evictions {cache.evictions})")
+
+    report = {}
+    for model_id in models:
+        evaluator = Evaluator(method=args.method)
+        for path in images:
+            gt_xyxy, gt_names = dataset.annotations(dataset.index_of(path))
+            evaluator.add(postprocess(predictions[model_id][path], thresholds={"default": 0.0}), gt_xyxy, gt_names)
+        print(f"\n=== {model_id} ({args.backend}) ===")
+        summary = evaluator.print_report()
+        summary["map"] = {str(t): value for t, value in summary["map"].items()}
+        report[model_id] = summary
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Metrics written to {args.output}")
+
+
+def _has_annotation(dataset, path):
+    try:
+        dataset.index_of(path)
+        return True
+    except KeyError:
+        print(f"⚠️ Skipping {os.path.basename(path)}, no matching XML.")
+        return False
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import numpy as np
+
+import config
+from postprocess import iou_matrix
+
+
+def match(iou, iou_threshold, method="greedy"):
+    """Match predictions (rows, sorted by descending confidence) to ground truths (columns).
+
+    Returns an int array with the matched ground-truth column per prediction, -1 for none.
+    "greedy" is the usual VOC/COCO rule: each prediction in confidence order takes the
+    best still-free ground truth. "hungarian" maximises total IoU instead (needs scipy).
+    """
+    n_pred, n_gt = iou.shape
+    matched = np.full(n_pred, -1, dtype=np.int64)
+    if n_pred == 0 or n_gt == 0:
+        return matched
+    if method == "hungarian":
+        from scipy.optimize import linear_sum_assignment
+        rows, cols = linear_sum_assignment(np.where(iou >= iou_threshold, iou, 0.0), maximize=True)
+        ok = iou[rows, cols] >= iou_threshold
+        matched[rows[ok]] = cols[ok]
+        return matched
+    if method != "greedy":
+        raise ValueError(f"Unknown matching method: {method}")
+    candidates = np.where(iou >= iou_threshold, iou, -1.0)
+    for i in range(n_pred):
+        j = int(np.argmax(candidates[i]))
+        if candidates[i, j] >= 0:
+            matched[i] = j
+            candidates[:, j] = -1.0
+    return matched
+
+
+def average_precision(recall, precision):
+    """All-point interpolated AP (VOC 2010+ / COCO style area under the PR envelope)."""
+    recall = np.concatenate([[0.0], recall, [1.0]])
+    precision = np.concatenate([[0.0], precision, [0.0]])
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    steps = np.flatnonzero(recall[1:] != recall[:-1])
+    return float(np.sum((recall[steps + 1] - recall[steps]) * precision[steps + 1]))
+
+
+class Evaluator:
+    """Accumulates per-image matches and reports precision/recall/AP per class and IoU threshold.
+
+    Per image only the IoU matrix between that image's boxes is computed (one NumPy
+    call); the per-detection bookkeeping is concatenated arrays, so evaluating tens of
+    thousands of annotations stays linear in Python work.
+    """
+
+    def __init__(self, class_names=config.EVAL_CLASSES, iou_thresholds=config.EVAL_IOU_THRESHOLDS,
+                 method="greedy"):
+        self.class_names = list(class_names)
+        self.class_index = {name: i for i, name in enumerate(self.class_names)}
+        self.iou_thresholds = tuple(iou_thresholds)
+        self.method = method
+        self.scores = {k: [] for k in range(len(self.class_names))}
+        self.true_positive = {(k, t): [] for k in range(len(self.class_names)) for t in self.iou_thresholds}
+        self.num_gt = np.zeros(len(self.class_names), dtype=np.int64)
+        # Rows: ground-truth class, columns: predicted class; last row/column is background
+        size = len(self.class_names) + 1
+        self.confusion = np.zeros((size, size), dtype=np.int64)
+        self.images = 0
+
+    def _ids(self, names):
+        return np.array([self.class_index[name] for name in names], dtype=np.int64)
+
+    def add(self, detections, gt_xyxy, gt_names):
+        """Add one image: Detections from postprocess() and ground-truth corner boxes with class names."""
+        gt_xyxy = np.asarray(gt_xyxy, dtype=np.float32).reshape(-1, 4)
+        # Classes outside the evaluated ones (a VOC "person" box, a model-only class) are left out on both sides
+        gt_known = np.array([name in self.class_index for name in gt_names], dtype=bool).reshape(-1)
+        gt_xyxy = gt_xyxy[gt_known]
+        gt_ids = self._ids([name for name, keep in zip(gt_names, gt_known) if keep])
+        known = np.array([name in self.class_index for name in detections.labels], dtype=bool)
+        detections = detections[known]
+        pred_ids = self._ids(detections.labels)
+        self.images += 1
+        self.num_gt += np.bincount(gt_ids, minlength=len(self.class_names))
+
+        iou = iou_matrix(detections.xyxy, gt_xyxy)
+        for k in np.unique(np.concatenate([pred_ids, gt_ids])):
+            p = np.flatnonzero(pred_ids == k)
+            p = p[np.argsort(-detections.confidence[p], kind="stable")]
+            g = np.flatnonzero(gt_ids == k)
+            self.scores[k].append(detections.confidence[p])
+            class_iou = iou[np.ix_(p, g)]
+            for t in self.iou_thresholds:
+                self.true_positive[(k, t)].append(match(class_iou, t, self.method) >= 0)
+        self._add_confusion(iou, pred_ids, gt_ids, detections.confidence)
+
+    def _add_confusion(self, iou, pred_ids, gt_ids, confidence, iou_threshold=0.5):
+        # Class-agnostic matching at IoU 0.5 tells which class a box was confused with
+        background = len(self.class_names)
+        order = np.argsort(-confidence, kind="stable")
+        matched = match(iou[order], iou_threshold, self.method)
+        hit = matched >= 0
+        np.add.at(self.confusion, (gt_ids[matched[hit]], pred_ids[order][hit]), 1)
+        np.add.at(self.confusion, (background, pred_ids[order][~hit]), 1)
+        missed = np.setdiff1d(np.arange(len(gt_ids)), matched[hit])
+        np.add.at(self.confusion, (gt_ids[missed], background), 1)
+
+    def class_metrics(self, k, iou_threshold):
+        scores = np.concatenate(self.scores[k]) if self.scores[k] else np.zeros(0)
+        tp = np.concatenate(self.true_positive[(k, iou_threshold)]) if scores.size else np.zeros(0, bool)
+        order = np.argsort(-scores, kind="stable")
+        tp = tp[order].astype(np.float64)
+        tp_cum = np.cumsum(tp)
+        fp_cum = np.cumsum(1.0 - tp)
+        n_gt = self.num_gt[k]
+        recall = tp_cum / n_gt if n_gt else np.zeros_like(tp_cum)
+        precision = tp_cum / np.maximum(tp_cum + fp_cum, 1e-9)
+        return {
+            "class": self.class_names[k],
+            "iou": iou_threshold,
+            "ground_truths": int(n_gt),
+            "detections": int(scores.size),
+            "true_positives": int(tp_cum[-1]) if tp.size else 0,
+            "precision": float(precision[-1]) if tp.size else 0.0,
+            "recall": float(recall[-1]) if tp.size else 0.0,
+            "ap": average_precision(recall, precision) if n_gt and tp.size else 0.0,
+        }
+
+    def summary(self):
+        """Per-class metrics for every IoU threshold plus mAP per threshold."""
+        per_class = [self.class_metrics(k, t) for t in self.iou_thresholds for k in range(len(self.class_names))]
+        mean_ap = {}
+        for t in self.iou_thresholds:
+            aps = [m["ap"] for m in per_class if m["iou"] == t and m["ground_truths"]]
+            mean_ap[t] = float(np.mean(aps)) if aps else 0.0
+        return {"images": self.images, "per_class": per_class, "map": mean_ap,
+                "confusion": self.confusion.tolist(), "confusion_labels": self.class_names + ["background"]}
+
+    def print_report(self):
+        result = self.summary()
+        print(f"📊 {result['images']} images")
+        print(f"{'class':<10} {'IoU':>5} {'GT':>6} {'det':>6} {'P':>6} {'R':>6} {'AP':>6}")
+        for m in result["per_class"]:
+            print(f"{m['class']:<10} {m['iou']:>5.2f} {m['ground_truths']:>6} {m['detections']:>6} "
+                  f"{m['precision']:>6.3f} {m['recall']:>6.3f} {m['ap']:>6.3f}")
+        for t, value in result["map"].items():
+            print(f"mAP@{t:.2f}: {value:.3f}")
+        labels = result["confusion_labels"]
+        print("Confusion (rows = ground truth, columns = predicted):")
+        print(" " * 11 + " ".join(f"{name[:8]:>8}" for name in labels))
+        for name, row in zip(labels, result["confusion"]):
+            print(f"{name[:10]:<10} " + " ".join(f"{count:>8}" for count in row))
+        return result
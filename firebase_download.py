@@ -1,6 +1,7 @@
 import firebase_admin
-from firebase_admin import credentials, db
-import time
+from firebase_admin import credentials
+import threading
+from gate_triggers import FirebaseTriggerSource
 
 # Initialize Firebase Admin SDK with the new credential
 cred = credentials.Certificate("ode-project-734d6-firebase-adminsdk-fbsvc-619b1a34a2.json")
@@ -12,24 +13,16 @@ except ValueError:
     # App already initialized
     pass
 
-# Reference the root path where timestamp nodes are stored
-ref = db.reference('/')
+# Stream /back and /front instead of polling a full get() of the root (which pulls the whole history)
+triggers = FirebaseTriggerSource()
+detected = threading.Event()
 
-while True:
-    # Fetch current values
-    data = ref.get()
+def on_trigger(direction):
+    print(f"Back: {triggers.values['back']}, Front: {triggers.values['front']}")
+    print("1 detected")
+    detected.set()
 
-    # Extract values for 'back' and 'front'
-    back_value = data.get('back', 0)
-    front_value = data.get('front', 0)
-
-    # Print values
-    print(f"Back: {back_value}, Front: {front_value}")
-
-    # Check if either one is 1
-    if back_value == 1 or front_value == 1:
-        print("1 detected")
-        break
-
-    # Wait a short time before checking again (to avoid hammering the server)
-    time.sleep(1)
+triggers.start()
+triggers.arm(on_trigger)
+detected.wait()
+triggers.stop()
@@ -0,0 +1,356 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+
+import config
+import metrics
+from metrics import percentile
+
+
+def _join(path, key):
+    return f"{path.strip('/')}/{key}".strip('/')
+
+
+def _is_ancestor(parent, child):
+    return child.startswith(parent + '/')
+
+
+# Error codes (firebase_admin.exceptions) for requests that will fail the same way every time
+PERMANENT_ERROR_CODES = {"INVALID_ARGUMENT", "FAILED_PRECONDITION", "NOT_FOUND", "PERMISSION_DENIED",
+                         "OUT_OF_RANGE", "ALREADY_EXISTS"}
+
+
+def is_permanent(error):
+    """True when retrying the write cannot help; network and server errors are transient."""
+    # The SDK validates paths and values before sending and raises ValueError/TypeError
+    if isinstance(error, (ValueError, TypeError)):
+        return True
+    code = getattr(error, "code", None)
+    if isinstance(code, str) and code.upper() in PERMANENT_ERROR_CODES:
+        return True
+    status = getattr(getattr(error, "http_response", None), "status_code", None)
+    return isinstance(status, int) and 400 <= status < 500 and status not in (408, 429)
+
+
+def split_related(journal, records):
+    """Split journaled writes into those on a path in records (same, above or below it) and the rest."""
+    if not journal or not records:
+        return [], journal
+    paths = {path for path, _ in records}
+    related, rest = [], []
+    for record in journal:
+        path = record[0]
+        hit = path in paths or any(_is_ancestor(path, p) or _is_ancestor(p, path) for p in paths)
+        (related if hit else rest).append(record)
+    return related, rest
+
+
+def coalesce(records):
+    """Fold ordered (path, value) writes into one multi-path update dict.
+
+    Firebase rejects an update containing both a path and one of its ancestors, so a
+    later write below an already pending path is merged into that value, and a later
+    write above pending paths replaces them.
+    """
+    updates = {}
+    for path, value in records:
+        ancestor = next((p for p in updates if _is_ancestor(p, path)), None)
+        if ancestor is not None:
+            node = updates[ancestor]
+            if not isinstance(node, dict):
+                node = updates[ancestor] = {}
+            keys = path[len(ancestor) + 1:].split('/')
+            for key in keys[:-1]:
+                if not isinstance(node.get(key), dict):
+                    node[key] = {}
+                node = node[key]
+            node[keys[-1]] = value
+            continue
+        for p in [p for p in updates if _is_ancestor(path, p)]:
+            del updates[p]
+        updates[path] = value
+    return updates
+
+
+class FirebaseWriteQueue:
+    """Write-behind queue for Realtime Database writes.
+
+    set()/update() return immediately. A worker thread coalesces pending writes into a
+    single multi-path update() on the root. While the database is unreachable the
+    writes are appended to a JSONL journal, which is replayed in order on reconnect.
+    New writes are sent first, along with the journaled writes to the same paths so
+    the newer value still wins; the rest of the backlog follows. A write Firebase
+    refuses for good is moved to the rejected log instead of blocking the queue.
+    """
+
+    def __init__(self, root_ref=None, journal_path=config.FIREBASE_JOURNAL_PATH,
+                 batch_size=config.FIREBASE_BATCH_SIZE, flush_interval=config.FIREBASE_FLUSH_INTERVAL,
+                 retry_interval=config.FIREBASE_RETRY_INTERVAL, rejected_path=config.FIREBASE_REJECTED_PATH):
+        self.root_ref = root_ref
+        self.journal_path = journal_path
+        self.rejected_path = rejected_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.pending = deque()
+        self.condition = threading.Condition()
+        self.journal_lock = threading.Lock()
+        self.journal_count = self._count_journal()
+        self.online = True
+        self.flushes = 0
+        self.flush_errors = 0
+        self.rejected = 0
+        self.flush_latencies = deque(maxlen=500)
+        self.running = False
+        self.thread = None
+        metrics.register_gauge("firebase_queue_depth", lambda: len(self.pending))
+        metrics.register_gauge("firebase_journal_depth", lambda: self.journal_count)
+        metrics.register_gauge("firebase_online", lambda: int(self.online))
+
+    def start(self):
+        if self.root_ref is None:
+            from firebase_admin import db
+            self.root_ref = db.reference('/')
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name="firebase-writer", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Flush what can be flushed; anything left over goes to the journal."""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+        with self.condition:
+            leftover = list(self.pending)
+            self.pending.clear()
+        self._append_journal([(path, value) for path, value, _ in leftover])
+
+    # --- Producer side (any thread, never blocks on the network) ---
+
+    def set(self, path, value, callback=None):
+        self._enqueue(path.strip('/'), value, callback)
+
+    def update(self, path, values, callback=None):
+        items = list(values.items())
+        for i, (key, value) in enumerate(items):
+            # Only the last record of the group reports completion
+            self._enqueue(_join(path, key), value, callback if i == len(items) - 1 else None)
+
+    def _enqueue(self, path, value, callback):
+        with self.condition:
+            self.pending.append((path, value, callback))
+            self.condition.notify()
+
+    # --- Journal ---
+
+    def _count_journal(self):
+        if not os.path.exists(self.journal_path):
+            return 0
+        with open(self.journal_path, encoding='utf-8') as f:
+            return sum(1 for line in f if line.strip())
+
+    def _append_journal(self, records):
+        """Journal records for a later retry; one that is not JSON could never be replayed, so it is rejected."""
+        lines = []
+        for path, value in records:
+            try:
+                lines.append(json.dumps({"path": path, "value": value}) + "\n")
+            except (TypeError, ValueError) as e:
+                self._reject((path, value), e)
+        if not lines:
+            return
+        with self.journal_lock:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            self.journal_count += len(lines)
+
+    def _read_journal(self):
+        records = []
+        with self.journal_lock:
+            if not os.path.exists(self.journal_path):
+                return records
+            with open(self.journal_path, encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Torn last line from a power cut
+                        continue
+                    records.append((entry["path"], entry["value"]))
+        return records
+
+    def _clear_journal(self):
+        with self.journal_lock:
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self.journal_count = 0
+
+    def _replace_journal(self, records):
+        """Keep only records in the journal (the others were delivered)."""
+        if not records:
+            self._clear_journal()
+            return
+        with self.journal_lock:
+            tmp = self.journal_path + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for path, value in records:
+                    f.write(json.dumps({"path": path, "value": value}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.journal_path)
+            self.journal_count = len(records)
+
+    def _reject(self, record, error):
+        path, value = record
+        print(f"❌ Firebase rejected the write to {path!r} ({error}), logged to {self.rejected_path}")
+        self.rejected += 1
+        metrics.inc("firebase_records_rejected")
+        try:
+            with open(self.rejected_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"path": path, "value": value, "error": str(error), "ts": time.time()},
+                                   default=str) + "\n")
+        except OSError as e:
+            print(f"⚠️ Could not log the rejected write: {e}")
+
+    # --- Worker ---
+
+    def _write(self, records):
+        start = time.perf_counter()
+        with metrics.span("firebase_flush"):
+            self.root_ref.update(coalesce(records))
+        self.flush_latencies.append(time.perf_counter() - start)
+        metrics.inc("firebase_records_written", len(records))
+        self.flushes += 1
+
+    def _deliver(self, records):
+        """Write records and return the paths Firebase refused for good; transient errors propagate.
+
+        One bad record makes the whole multi-path update fail, so a permanently refused
+        batch is resent one record at a time and only the records still refused are rejected.
+        """
+        if not records:
+            return set()
+        try:
+            self._write(records)
+            return set()
+        except Exception as e:
+            if not is_permanent(e):
+                raise
+            if len(records) == 1:
+                self._reject(records[0], e)
+                return {records[0][0]}
+        rejected = set()
+        for record in records:
+            rejected |= self._deliver([record])
+        return rejected
+
+    def _replay_journal(self, records):
+        for i in range(0, len(records), self.batch_size):
+            self._deliver(records[i:i + self.batch_size])
+        self._clear_journal()
+        print(f"✅ Replayed {len(records)} journaled Firebase writes")
+
+    def _went_offline(self, error):
+        self.flush_errors += 1
+        if self.online:
+            print(f"⚠️ Firebase write failed ({error}), journaling writes until it is reachable")
+        self.online = False
+
+    def _came_online(self):
+        if not self.online:
+            print("✅ Firebase reachable again")
+        self.online = True
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and not self.pending and not self.journal_count:
+                    self.condition.wait()
+                if self.running and not self.pending:
+                    # Offline backlog only: retry it periodically
+                    self.condition.wait(timeout=self.retry_interval)
+                if not self.running and not self.pending:
+                    return
+            if self.running and self.flush_interval:
+                # Let a burst of writes from one gate event land in the same batch
+                time.sleep(self.flush_interval)
+            with self.condition:
+                batch = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+            records = [(path, value) for path, value, _ in batch]
+            journal = self._read_journal() if self.journal_count else []
+            # Gate writes go first; journaled writes to the same paths ride along, older ones first
+            related, rest = split_related(journal, records)
+            try:
+                rejected = self._deliver(related + records)
+            except Exception as e:
+                self._went_offline(e)
+                self._append_journal(records)
+                if not self.running:
+                    return
+                time.sleep(self.retry_interval)
+                continue
+            if related:
+                self._replace_journal(rest)
+            if related or records:
+                self._came_online()
+            for path, _, callback in batch:
+                if callback is not None and path not in rejected:
+                    try:
+                        callback()
+                    except Exception as e:
+                        print(f"⚠️ Firebase write callback failed: {e}")
+            if rest:
+                try:
+                    self._replay_journal(rest)
+                    self._came_online()
+                except Exception as e:
+                    self._went_offline(e)
+                    if not self.running:
+                        return
+                    time.sleep(self.retry_interval)
+
+    def stats(self):
+        return {
+            "queue_depth": len(self.pending),
+            "journal_depth": self.journal_count,
+            "online": self.online,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "rejected": self.rejected,
+            "flush_p50_ms": percentile(self.flush_latencies, 50) * 1000,
+            "flush_p95_ms": percentile(self.flush_latencies, 95) * 1000,
+        }
+
+
+def init_firebase():
+    """Initialise the default Firebase app from config once per process."""
+    import firebase_admin
+    from firebase_admin import credentials
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(config.FIREBASE_CREDENTIALS), {
+            'databaseURL': config.FIREBASE_DATABASE_URL
+        })
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_firebase_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = FirebaseWriteQueue()
+    return _writer
@@ -0,0 +1,135 @@
+import threading
+from collections import Counter, namedtuple
+
+import config
+import metrics
+
+# reason is None for a frame that passes
+QualityScore = namedtuple("QualityScore", "sharpness brightness clipped motion presence score reason")
+
+REJECT_MESSAGES = {
+    "dark": "Image too dark",
+    "bright": "Image too bright",
+    "blurry": "Image too blurry",
+    "moving": "Please hold still",
+    "empty": "Please stand in front of the camera",
+    "no_frame": "Failed to capture image",
+}
+
+
+class FrameQualityGate:
+    """Scores PPE camera frames before they are sent to the detector and picks the best one.
+
+    Scoring runs on a small grayscale thumbnail: Laplacian variance for sharpness, the
+    histogram for exposure (mean level and clipped shadows/highlights), the difference
+    to the previous buffered frame for motion, and the difference to an empty-scene
+    snapshot (set_background) for whether anyone is in front of the camera.
+    A window with no acceptable frame costs no inference call; stats() counts those.
+    """
+
+    def __init__(self, enabled=config.QUALITY_GATE, thumb_width=config.QUALITY_THUMB_WIDTH,
+                 min_sharpness=config.QUALITY_MIN_SHARPNESS, brightness=config.QUALITY_BRIGHTNESS,
+                 max_clipped=config.QUALITY_MAX_CLIPPED, max_motion=config.QUALITY_MAX_MOTION,
+                 min_presence=config.QUALITY_MIN_PRESENCE):
+        self.enabled = enabled
+        self.thumb_width = thumb_width
+        self.min_sharpness = min_sharpness
+        self.min_brightness, self.max_brightness = brightness
+        self.max_clipped = max_clipped
+        self.max_motion = max_motion
+        self.min_presence = min_presence
+        self.background = None
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    def _thumb(self, frame):
+        # cv2 and numpy load on first use: lanes (and so the app's boot path) import this module
+        import cv2
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        h, w = gray.shape
+        if w > self.thumb_width:
+            gray = cv2.resize(gray, (self.thumb_width, max(1, h * self.thumb_width // w)), interpolation=cv2.INTER_AREA)
+        return gray
+
+    def set_background(self, frame):
+        """Snapshot of the empty scene; without one the presence check is skipped."""
+        self.background = None if frame is None else self._thumb(frame)
+
+    def drop_background(self):
+        """Stop the presence check for this session: the snapshot may have had the worker in it."""
+        if self.background is None:
+            return False
+        self.background = None
+        with self.lock:
+            self.counts["background_dropped"] += 1
+        metrics.inc("quality_background_dropped")
+        return True
+
+    def score(self, frame, previous=None):
+        """Return (QualityScore, thumbnail); pass the previous frame's thumbnail to check motion."""
+        import cv2
+        import numpy as np
+        thumb = self._thumb(frame)
+        sharpness = float(cv2.Laplacian(thumb, cv2.CV_64F).var())
+        hist = np.bincount(thumb.ravel(), minlength=256)
+        brightness = float(np.dot(hist, np.arange(256)) / thumb.size)
+        shadows, highlights = hist[:16].sum() / thumb.size, hist[240:].sum() / thumb.size
+        clipped = float(shadows + highlights)
+        motion = float(cv2.absdiff(thumb, previous).mean()) if previous is not None and previous.shape == thumb.shape else 0.0
+        background = self.background
+        presence = float(cv2.absdiff(thumb, background).mean()) if background is not None and background.shape == thumb.shape else None
+
+        if brightness < self.min_brightness or (clipped > self.max_clipped and shadows >= highlights):
+            reason = "dark"
+        elif brightness > self.max_brightness or clipped > self.max_clipped:
+            reason = "bright"
+        elif sharpness < self.min_sharpness:
+            reason = "blurry"
+        elif motion > self.max_motion:
+            reason = "moving"
+        elif presence is not None and presence < self.min_presence:
+            reason = "empty"
+        else:
+            reason = None
+        return QualityScore(sharpness, brightness, clipped, motion, presence, sharpness * (1.0 - clipped), reason), thumb
+
+    def best(self, items):
+        """Pick the best frame from camera.recent() items [(seq, ts, frame), ...].
+
+        Returns (frame, score). frame is None when every frame was rejected, and score then
+        holds the best rejected one (its reason says why). With the gate disabled the newest
+        frame is returned unscored.
+        """
+        if not items:
+            return None, QualityScore(0.0, 0.0, 0.0, 0.0, None, 0.0, "no_frame")
+        if not self.enabled:
+            return items[-1][2], None
+        best_frame, best_score, best_rejected = None, None, None
+        previous = None
+        rejected = Counter()
+        for _, _, frame in items:
+            score, previous = self.score(frame, previous)
+            if score.reason is not None:
+                rejected[score.reason] += 1
+                if best_rejected is None or score.score > best_rejected.score:
+                    best_rejected = score
+            elif best_score is None or score.score > best_score.score:
+                best_frame, best_score = frame, score
+        with self.lock:
+            self.counts["frames_scored"] += len(items)
+            for reason, count in rejected.items():
+                self.counts[f"rejected_{reason}"] += count
+            self.counts["inference_calls" if best_frame is not None else "inference_saved"] += 1
+        for reason, count in rejected.items():
+            metrics.inc("quality_rejected_frames", count, reason=reason)
+        if best_frame is None:
+            metrics.inc("inference_saved", reason=best_rejected.reason)
+            return None, best_rejected
+        return best_frame, best_score
+
+    def stats(self):
+        with self.lock:
+            counts = dict(self.counts)
+        windows = counts.get("inference_calls", 0) + counts.get("inference_saved", 0)
+        counts["saved_rate"] = counts.get("inference_saved", 0) / windows if windows else 0.0
+        return counts
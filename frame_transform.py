@@ -0,0 +1,79 @@
+import cv2
+import numpy as np
+
+ROTATIONS = {
+    None: None,
+    "cw": cv2.ROTATE_90_CLOCKWISE,
+    "ccw": cv2.ROTATE_90_COUNTERCLOCKWISE,
+    "180": cv2.ROTATE_180,
+}
+
+
+class FrameTransform:
+    """Per-camera preview stage: rotation and fit-to-display into preallocated buffers.
+
+    Buffers are allocated on the first frame (and again only if the camera resolution
+    changes), so steady-state previews allocate nothing. Frames stay BGR: the texture is
+    created once with colorfmt='bgr' and flipped in texture coordinates, so neither the
+    channel swap nor Kivy's bottom-up row order costs a pass over the pixels.
+    """
+
+    def __init__(self, rotate=None, display_size=None):
+        if rotate not in ROTATIONS:
+            raise ValueError(f"Unknown rotation: {rotate}")
+        self.rotate = ROTATIONS[rotate]
+        self.display_size = display_size
+        self.input_shape = None
+        self.scale = 1.0
+        self.texture = None
+
+    def _allocate(self, shape):
+        h, w = shape[:2]
+        if self.rotate in (cv2.ROTATE_90_CLOCKWISE, cv2.ROTATE_90_COUNTERCLOCKWISE):
+            h, w = w, h
+        self.scale = 1.0
+        if self.display_size:
+            self.scale = min(1.0, self.display_size[0] / w, self.display_size[1] / h)
+        self.size = (max(1, round(w * self.scale)), max(1, round(h * self.scale)))
+        self.output = np.empty((self.size[1], self.size[0], 3), dtype=np.uint8)
+        # Without a resize the rotation writes straight into the output buffer
+        self.rotated = self.output if self.scale == 1.0 else np.empty((h, w, 3), dtype=np.uint8)
+        self.input_shape = shape
+        self.texture = None
+
+    def apply(self, frame):
+        """Transform a BGR camera frame; returns the (reused) output buffer, safe to draw on.
+
+        Coordinates in the rotated, full-resolution frame map to the output by self.scale.
+        """
+        if frame.shape != self.input_shape:
+            self._allocate(frame.shape)
+        src = frame
+        if self.rotate is not None:
+            src = cv2.rotate(frame, self.rotate, dst=self.rotated)
+        if self.scale < 1.0:
+            cv2.resize(src, self.size, dst=self.output, interpolation=cv2.INTER_AREA)
+        elif src is not self.output:
+            np.copyto(self.output, src)
+        return self.output
+
+    def upload(self):
+        """Blit the output buffer into this stage's texture; returns the texture."""
+        if self.texture is None:
+            from kivy.graphics.texture import Texture
+            self.texture = Texture.create(size=self.size, colorfmt='bgr')
+            self.texture.flip_vertical()
+        self.texture.blit_buffer(self.output.reshape(-1), colorfmt='bgr', bufferfmt='ubyte')
+        return self.texture
+
+    def show(self, frame, widget):
+        """apply() + upload() into a Kivy Image widget."""
+        self.apply(frame)
+        self.present(widget)
+
+    def present(self, widget):
+        texture = self.upload()
+        if widget.texture is not texture:
+            widget.texture = texture
+        else:
+            widget.canvas.ask_update()
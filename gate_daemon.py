@@ -0,0 +1,106 @@
+"""Run the gate lanes headless: same GateEngine as the Kivy app, no display needed.
+
+    python gate_daemon.py                                   # every lane in config.LANES, live cameras
+    python gate_daemon.py --video qr_front=front.mp4 --video ppe=ppe.mp4 --triggers fake --auto front --fast
+"""
+import time
+import argparse
+
+import config
+from startup import Startup, add_gate_services
+
+CAMERA_ROLES = ("qr_front", "qr_back", "ppe")
+FAST_TIMINGS = {"qr_countdown": 0, "ppe_countdown": 0, "granted_delay": 0, "retry_delay": 0, "result": 0}
+
+
+def parse_videos(items):
+    videos = {}
+    for item in items or []:
+        role, _, path = item.partition("=")
+        if role not in CAMERA_ROLES or not path:
+            raise SystemExit(f"--video expects ROLE=PATH with ROLE in {', '.join(CAMERA_ROLES)}, got {item!r}")
+        videos[role] = path
+    return videos
+
+
+def lane_configs(names, videos, trigger_source):
+    lanes = [dict(lane) for lane in config.LANES if not names or lane["name"] in names]
+    if not lanes:
+        raise SystemExit(f"No lanes named {', '.join(names)} in config.LANES")
+    for lane in lanes:
+        lane.update(videos)
+        lane["trigger_source"] = trigger_source
+    return lanes
+
+
+def log_engine(auto):
+    def on_event(engine, kind):
+        if kind in ("scanned", "ppe_result"):
+            return
+        print(f"🚦 [{engine.lane.name}] {engine.state}: {engine.status_text()}")
+        # Fake triggers: raise the flag again as soon as the lane is idle, for back-to-back sessions
+        if auto and kind == "state" and engine.state == "idle":
+            engine.lane.triggers.set(auto, 1)
+    return on_event
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lane", action="append", dest="lanes", help="lane name from config.LANES (default: all)")
+    parser.add_argument("--video", action="append", help="ROLE=PATH, replace a camera with a video file")
+    parser.add_argument("--triggers", choices=["firebase", "fake"], default=config.TRIGGER_SOURCE)
+    parser.add_argument("--auto", choices=["front", "back"], help="with --triggers fake, re-trigger whenever idle")
+    parser.add_argument("--fast", action="store_true", help="skip countdowns and result delays")
+    parser.add_argument("--sessions", type=int, default=0, help="exit after this many completed sessions")
+    parser.add_argument("--stats-interval", type=float, default=config.LANE_STATS_INTERVAL)
+    parser.add_argument("--metrics-port", type=int, default=config.METRICS_PORT, help="0 disables /metrics")
+    parser.add_argument("--json-logs", action="store_true", help="structured JSON event lines on stdout")
+    parser.add_argument("--audio", choices=["pygame", "null"], default=config.AUDIO_BACKEND,
+                        help="spoken prompts, or null for silent")
+    args = parser.parse_args()
+    if args.auto and args.triggers != "fake":
+        parser.error("--auto needs --triggers fake")
+
+    from lanes import load_lanes, print_lane_report
+    import metrics
+
+    config.METRICS_STRUCTURED_LOGS = config.METRICS_STRUCTURED_LOGS or args.json_logs
+    config.AUDIO_BACKEND = args.audio
+    metrics.start_http_server(args.metrics_port)
+    lanes = load_lanes(lane_configs(args.lanes, parse_videos(args.video), args.triggers))
+    boot = add_gate_services(Startup(), lanes, timings=FAST_TIMINGS if args.fast else None).start()
+    if not boot.wait():
+        raise SystemExit(f"Startup failed:\n{boot.status_text()}")
+    writer, _ = boot.results["firebase"]
+    _, scheduler = boot.results["inference"]
+    cameras = boot.results["cameras"]
+    engines = boot.results["gate"]
+
+    for lane in lanes:
+        lane.triggers.start()
+    for engine in engines:
+        engine.add_listener(log_engine(args.auto))
+        engine.start()
+    print(f"🚀 Gate daemon running {len(engines)} lane(s): {', '.join(lane.name for lane in lanes)}")
+
+    last_report = time.monotonic()
+    try:
+        while not args.sessions or sum(engine.sessions for engine in engines) < args.sessions:
+            time.sleep(0.5)
+            if time.monotonic() - last_report >= args.stats_interval:
+                print_lane_report(lanes, scheduler)
+                last_report = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print_lane_report(lanes, scheduler)
+        for engine in engines:
+            engine.stop()
+        for lane in lanes:
+            lane.triggers.stop()
+        writer.stop()
+        cameras.release_all()
+
+
+if __name__ == "__main__":
+    main()
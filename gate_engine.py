@@ -0,0 +1,416 @@
+import math
+import time
+import queue
+import threading
+
+import cv2
+
+import config
+import metrics
+import annotation
+from postprocess import postprocess
+from ppe_stream import StreamingPPEChecker, REQUIRED_PPE
+from frame_quality import REJECT_MESSAGES
+from compliance_cache import get_compliance_cache
+
+# --- States ---
+IDLE = "idle"              # armed, waiting for /front or /back
+COUNTDOWN = "countdown"    # "Scanning QR in N"
+SCAN = "scan"              # decoding QR codes from the direction's camera
+PPE_CHECK = "ppe_check"    # entering worker: streaming or countdown PPE check
+GRANTED = "granted"        # result shown, /front reset when it ends
+
+class GateEngine:
+    """State machine for one gate lane, independent of any UI.
+
+    IDLE -> COUNTDOWN -> SCAN -> (back: IDLE) | (front: PPE_CHECK -> GRANTED -> IDLE)
+
+    Everything runs on the engine's own thread: trigger, QR and PPE callbacks only post
+    events, timed steps are deadlines, and the camera is polled every GATE_TICK while
+    scanning. Views (the Kivy screens, the daemon's log) subscribe with add_listener()
+    and read the engine's attributes; they never drive the flow themselves.
+    step() runs one iteration on the caller's thread instead, for replays and tests.
+    """
+
+    def __init__(self, lane, detector, cameras, qr_decoder, writer, attendance, timings=None, clock=time.monotonic,
+                 compliance=None):
+        self.lane = lane
+        self.detector = detector
+        self.cameras = cameras
+        self.qr_decoder = qr_decoder
+        self.writer = writer
+        self.attendance = attendance
+        self.compliance = compliance or get_compliance_cache()
+        self.timings = {
+            "qr_countdown": config.GATE_QR_COUNTDOWN,
+            "ppe_countdown": config.GATE_PPE_COUNTDOWN,
+            "granted_delay": config.GATE_GRANTED_DELAY,
+            "retry_delay": config.GATE_RETRY_DELAY,
+            "result": config.GATE_RESULT_SECONDS,
+            "stream_timeout": config.STREAM_TIMEOUT,
+            "quality_retry": config.QUALITY_RETRY_DELAY,
+            "confirm_delay": config.COMPLIANCE_CONFIRM_DELAY,
+        }
+        self.timings.update(timings or {})
+        self.clock = clock
+        self.events = queue.Queue()
+        self.listeners = []
+        self.running = False
+        self.thread = None
+
+        self.state = None
+        self.state_entered = None
+        self.direction = None
+        self.message = ""
+        self.deadline = None
+        self.deadline_action = None
+        self.camera = None
+        self.last_seq = 0
+        self.scanned = set()
+        self.last_scan = None
+        self.event_id = None
+        self.cache_result = None
+        self.ppe_flags = None
+        self.checker = None
+        self.quality_retries = 0
+        self.live_detections = None
+        self.result = None
+        self.sessions = 0
+
+    # --- Running ---
+
+    def add_listener(self, callback):
+        """callback(engine, kind) on the engine thread; kind is "state", "message" or "scanned"."""
+        self.listeners.append(callback)
+
+    def start(self):
+        self._enter_idle()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=f"gate-{self.lane.name}", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.events.put(None)
+        self._stop_checker()
+        self.lane.triggers.disarm()
+
+    def post(self, name, *args):
+        """Queue an event from any thread."""
+        self.events.put((name, args))
+
+    def _run(self):
+        while self.running:
+            self.step(self._wait_time())
+
+    def _wait_time(self):
+        waits = [config.GATE_TICK] if self.state == SCAN else []
+        if self.deadline is not None:
+            waits.append(max(0.0, self.deadline - self.clock()))
+        return min(waits) if waits else None
+
+    def step(self, timeout=0.0):
+        """Handle queued events (waiting up to timeout for the first), due deadlines and camera polling."""
+        if self.state is None:
+            self._enter_idle()
+        try:
+            event = self.events.get(timeout=timeout) if timeout is None or timeout > 0 else self.events.get_nowait()
+        except queue.Empty:
+            event = None
+        while event is not None:
+            name, args = event
+            getattr(self, f"_on_{name}")(*args)
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                event = None
+        if self.deadline is not None and self.clock() >= self.deadline:
+            action, self.deadline, self.deadline_action = self.deadline_action, None, None
+            action()
+        if self.state == SCAN:
+            self._poll_camera()
+
+    def remaining(self):
+        """Whole seconds left on the current timed step (0 when none)."""
+        if self.deadline is None:
+            return 0
+        return max(0, math.ceil(self.deadline - self.clock()))
+
+    def status_text(self):
+        return self.message.format(remaining=self.remaining())
+
+    # --- Transitions ---
+
+    def _notify(self, kind):
+        for callback in self.listeners:
+            callback(self, kind)
+
+    def _set_state(self, state, message=""):
+        now = time.perf_counter()
+        if self.state is not None:
+            metrics.observe("gate_stage", now - self.state_entered, lane=self.lane.name, stage=self.state)
+        metrics.log_event("gate_state", lane=self.lane.name, state=state, direction=self.direction)
+        self.state_entered = now
+        self.state = state
+        self.message = message
+        self.deadline = None
+        self.deadline_action = None
+        self._notify("state")
+
+    def _set_message(self, message):
+        self.message = message
+        self._notify("message")
+
+    def _after(self, seconds, action):
+        self.deadline = self.clock() + seconds
+        self.deadline_action = action
+
+    def _enter_idle(self):
+        self._stop_checker()
+        self._set_state(IDLE, "Welcome to SmartGate")
+        self.direction = None
+        self.camera = None
+        self.event_id = None
+        self.cache_result = None
+        self.live_detections = None
+        self.lane.triggers.arm(lambda direction: self.post("trigger", direction))
+
+    def _on_trigger(self, direction):
+        if self.state != IDLE:
+            return
+        print(f"🔑 [{self.lane.name}] {direction.capitalize()} = 1 detected. Proceeding to {direction} QR scan.")
+        self.lane.triggers.disarm()
+        self.direction = direction
+        if direction == "front":
+            # The worker is still at the QR camera: remember what the PPE camera sees with nobody there
+            self.lane.quality.set_background(self.cameras.get(self.lane.ppe).latest()[1])
+        self._set_state(COUNTDOWN, "Scanning QR in {remaining}")
+        self._after(self.timings["qr_countdown"], self._enter_scan)
+
+    def _enter_scan(self):
+        index = self.lane.qr_back if self.direction == "back" else self.lane.qr_front
+        self.camera = self.cameras.get(index)
+        self.last_seq = 0
+        self.scanned = set()
+        self._set_state(SCAN, "Scan your QR code")
+
+    def _poll_camera(self):
+        seq, frame = self.camera.latest()
+        if frame is None or seq == self.last_seq:
+            return
+        self.last_seq = seq
+        self.qr_decoder.submit(frame, seq, lambda result: self.post("decoded", result), lane=self.lane.name)
+
+    def _on_decoded(self, result):
+        if self.state != SCAN:
+            return
+        for barcode_data in result.data:
+            if barcode_data in self.scanned:
+                continue
+            self.scanned.add(barcode_data)
+            self.last_scan = barcode_data
+            metrics.inc("qr_scans", lane=self.lane.name, direction=self.direction)
+            self._notify("scanned")
+            event_id = self._record_scan(barcode_data, 'out' if self.direction == 'back' else 'in',
+                                         on_written=lambda result=result: self.qr_decoder.record_write(result))
+            print(f"📥 Scanned and queued for upload: {barcode_data}")
+            if self.direction == 'back':
+                self.writer.set(self.lane.back_path, 0)
+                self.lane.triggers.clear('back')
+                self.writer.set(self.lane.door_status_path, 1)
+                print("✅ Back reset to 0 and door_status set to 1 queued for Firebase.")
+                self.sessions += 1
+                self._enter_idle()
+            else:
+                self.event_id = event_id
+                self._enter_ppe_check()
+            return
+
+    def _record_scan(self, id_number, direction, on_written=None):
+        def written():
+            print("✅ Data successfully written to Firebase")
+            if on_written:
+                on_written()
+        event_id = self.attendance.record_scan(id_number, direction, on_synced=written)
+        self.attendance.request_sync()
+        return event_id
+
+    # --- PPE check ---
+
+    def _enter_ppe_check(self):
+        self.camera = self.cameras.get(self.lane.ppe)
+        self.live_detections = None
+        self.cache_result, cached = self.compliance.lookup(self.last_scan)
+        track = self.lane.tracker.cached(self.last_scan)
+        if track is None:
+            # Whoever is in view was not verified under this ID: their windows must not count for it
+            self.lane.tracker.reset()
+        else:
+            # The worker at the gate is still tracked and was compliant moments ago: no new inference
+            print(f"♻️ [{self.lane.name}] Reusing PPE result of track {track.id}")
+            self.lane.start_check()
+            self._set_state(PPE_CHECK, "Authorized Access\nChecking PPE...")
+            self._finish_check(track.frame, track.detections, track.flags)
+            return
+        if cached is not None:
+            # Same ID passed a full check within COMPLIANCE_CACHE_TTL: one frame confirms it, no countdown
+            print(f"♻️ [{self.lane.name}] {self.last_scan} passed a PPE check recently, confirming on one frame")
+            self.lane.start_check()
+            self._set_state(PPE_CHECK, "Authorized Access\nConfirming PPE...")
+            self._after(self.timings["confirm_delay"], self._confirm_cached)
+            return
+        self._start_full_check()
+
+    def _start_full_check(self):
+        if config.PPE_CHECK_MODE == "stream":
+            self._set_state(PPE_CHECK, "Authorized Access\nChecking PPE...")
+            self._start_streaming()
+        else:
+            self._set_state(PPE_CHECK)
+            self._start_countdown()
+
+    def _confirm_cached(self):
+        frame, _ = self.lane.quality.best(self.camera.recent())
+        checked = None if frame is None else self._infer(frame)
+        if checked is not None and all(checked[2].values()):
+            self._finish_check(*checked)
+            return
+        # No usable frame, a failed call or missing PPE: the cached result is not enough, check in full
+        print(f"🔁 [{self.lane.name}] Cached PPE result not confirmed, running the full check")
+        self._start_full_check()
+
+    def _start_streaming(self):
+        self.lane.start_check()
+        checker = StreamingPPEChecker(
+            self.camera, self.detector,
+            on_result=lambda frame, detections, window: self.post("ppe_progress", checker, detections, window.hits()),
+            on_compliant=lambda frame, detections, window: self.post("ppe_compliant", checker, frame, detections,
+                                                                     window.flags()),
+            quality=self.lane.quality,
+            on_rejected=lambda score: self.post("ppe_rejected", checker, score),
+            tracker=self.lane.tracker)
+        self.checker = checker.start()
+        self._after(self.timings["stream_timeout"], self._on_stream_timeout)
+
+    def _stop_checker(self):
+        if self.checker is not None:
+            self.checker.stop()
+            self.checker = None
+
+    def _on_ppe_progress(self, checker, detections, hits):
+        if checker is not self.checker:
+            return
+        self.live_detections = detections
+        self._set_message("Checking PPE: " + "  ".join(
+            f"{name} {hits[name]}/{checker.window.min_hits}" for name in hits))
+
+    def _on_ppe_rejected(self, checker, score):
+        if checker is not self.checker:
+            return
+        self._set_message(f"Checking PPE: {REJECT_MESSAGES[score.reason]}")
+
+    def _on_ppe_compliant(self, checker, frame, detections, flags):
+        if checker is not self.checker:
+            return
+        self._finish_check(frame, detections, flags)
+
+    def _on_stream_timeout(self):
+        checker = self.checker
+        if checker is None:
+            return
+        flags = checker.window.flags()
+        self._stop_checker()
+        # A worker already in view at the trigger makes every frame look "empty"; retry without that check
+        if self.lane.quality.drop_background():
+            print(f"🔁 [{self.lane.name}] No compliant PPE before the timeout, retrying without the presence check")
+        self._record_ppe_result(flags)
+        self._set_message("❌ Incomplete PPE. Retrying...")
+        self._start_streaming()
+
+    def _start_countdown(self):
+        self.lane.start_check()
+        self.quality_retries = 0
+        self._set_message("Authorized Access\nScanning PPE in {remaining}")
+        self._after(self.timings["ppe_countdown"], self._capture_and_infer)
+
+    def _capture_and_infer(self):
+        # Best acceptable frame in the camera buffer; a rejected window costs no inference call
+        frame, score = self.lane.quality.best(self.camera.recent())
+        if frame is None:
+            self._set_message(f"❌ {REJECT_MESSAGES[score.reason]}. Retrying...")
+            self.quality_retries += 1
+            if score.reason != "no_frame" and self.quality_retries <= config.QUALITY_RETRIES:
+                self._after(self.timings["quality_retry"], self._capture_and_infer)
+            else:
+                if score.reason == "empty":
+                    # The empty-scene snapshot may have had the worker in it
+                    self.lane.quality.drop_background()
+                self._start_countdown()
+            return
+        checked = self._infer(frame)
+        if checked is None:
+            self._set_message("❌ Inference failed. Retrying...")
+            self._start_countdown()
+            return
+        self._finish_check(*checked)
+
+    def _infer(self, frame):
+        """One PPE camera frame through the detector: (frame, detections, flags), or None if the call failed."""
+        frame = cv2.rotate(frame, cv2.ROTATE_90_COUNTERCLOCKWISE)
+        # frame stays in memory: encoded/downscaled by the backend, annotated in place
+        try:
+            result = self.detector.infer(frame)
+        except Exception as e:
+            print(f"⚠️ Inference failed: {e}")
+            return None
+        detections = postprocess(result)
+        # Only the PPE on the person nearest the gate counts, not a bystander's
+        track = self.lane.tracker.update(detections, frame)
+        detected_items = track.present if track is not None else set()
+        flags = {name: int(name in detected_items) for name in REQUIRED_PPE}
+        return frame, detections, flags
+
+    def _record_ppe_result(self, flags):
+        self.lane.record_decision(all(flags.values()))
+        if all(flags.values()):
+            self.lane.tracker.claim(self.last_scan, flags)
+        # A pass is (re)cached for the scanned ID, a failure drops it
+        evictions = self.compliance.put(self.last_scan, flags) if self.cache_result else None
+        metrics.log_event("ppe_decision", lane=self.lane.name, event_id=self.event_id, cache=self.cache_result,
+                          **flags)
+        if self.event_id:
+            self.attendance.record_ppe(self.event_id, flags["hardhat"], flags["vest"], flags["gloves"],
+                                       cache=self.cache_result, cache_evictions=evictions)
+            self.attendance.request_sync()
+        self.ppe_flags = flags
+        self._notify("ppe_result")
+
+    def _finish_check(self, frame, detections, flags):
+        self._stop_checker()
+        self.live_detections = detections
+        with metrics.span("annotate"):
+            image = annotation.get_renderer().draw(frame.copy(), detections)
+        self.result = {"image": image, "detections": detections, "flags": flags}
+        if config.SAVE_ANNOTATED_RESULT:
+            annotation.save(image, config.ANNOTATED_RESULT_PATH, config.ANNOTATED_RESULT_QUALITY)
+        self._record_ppe_result(flags)
+
+        if all(flags.values()):
+            self._set_message("✅ Access Granted: Complete PPE Detected")
+            self._after(self.timings["granted_delay"], self._enter_granted)
+        else:
+            self._set_message("❌ Incomplete PPE. Retrying...")
+            self._after(self.timings["retry_delay"], self._start_countdown)
+
+    def _enter_granted(self):
+        self._set_state(GRANTED, "Complete PPE: Access Granted!")
+        if config.DOOR_OPEN_ON_PPE_PASS:
+            self.writer.set(self.lane.door_status_path, 1)
+        self._after(self.timings["result"], self._reset_front)
+
+    def _reset_front(self):
+        self.writer.set(self.lane.front_path, 0)
+        self.lane.triggers.clear('front')
+        self.sessions += 1
+        self._enter_idle()
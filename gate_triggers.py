@@ -0,0 +1,108 @@
+import threading
+
+import config
+
+# Checked in this order when both are raised, same as the old polling loop
+TRIGGER_PATHS = ("front", "back")
+
+
+class TriggerSource:
+    """Tracks the /front and /back flags and fires one armed callback when either becomes 1.
+
+    Subclasses only have to feed value changes into _on_value(); the idle screen arms
+    a callback, and a flag that is already raised at arm time fires immediately.
+    """
+
+    def __init__(self, paths=TRIGGER_PATHS):
+        self.paths = paths
+        self.values = {name: None for name in paths}
+        self.lock = threading.Lock()
+        self.callback = None
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def arm(self, callback):
+        """callback(direction) is called once, from the source's thread, then disarmed."""
+        with self.lock:
+            self.callback = callback
+            fire = self._take_trigger()
+        if fire:
+            fire[0](fire[1])
+
+    def disarm(self):
+        with self.lock:
+            self.callback = None
+
+    def clear(self, name):
+        """Record locally that the app itself reset a flag, so re-arming does not see a stale 1."""
+        with self.lock:
+            self.values[name] = 0
+
+    def _take_trigger(self):
+        if self.callback is None:
+            return None
+        for name in self.paths:
+            if self.values.get(name) == 1:
+                callback, self.callback = self.callback, None
+                return callback, name
+        return None
+
+    def _on_value(self, name, value):
+        with self.lock:
+            self.values[name] = value
+            fire = self._take_trigger()
+        if fire:
+            fire[0](fire[1])
+
+
+class FirebaseTriggerSource(TriggerSource):
+    """Streams /front and /back with Firebase listeners opened once for the app's lifetime.
+
+    refs maps each trigger name to its database path, so every gate lane can listen on its own flags.
+    """
+
+    def __init__(self, paths=TRIGGER_PATHS, refs=None):
+        super().__init__(paths)
+        self.refs = {name: f'/{name}' for name in paths}
+        self.refs.update(refs or {})
+        self.registrations = []
+
+    def start(self):
+        from firebase_admin import db
+        if self.registrations:
+            return
+        for name in self.paths:
+            self.registrations.append(db.reference(self.refs[name]).listen(self._handler(name)))
+        print(f"👂 Listening for {', '.join(self.refs[name] for name in self.paths)}")
+
+    def _handler(self, name):
+        def handle(event):
+            # Leaf values only ever arrive as a put at the listened path itself
+            if event.path == '/':
+                self._on_value(name, event.data)
+        return handle
+
+    def stop(self):
+        for registration in self.registrations:
+            registration.close()
+        self.registrations = []
+
+
+class FakeTriggerSource(TriggerSource):
+    """In-process stand-in for tests and headless runs: call set('front', 1) to trigger."""
+
+    def set(self, name, value):
+        self._on_value(name, value)
+
+
+def create_trigger_source(kind=None, refs=None):
+    kind = kind or config.TRIGGER_SOURCE
+    if kind == "firebase":
+        return FirebaseTriggerSource(refs=refs)
+    if kind == "fake":
+        return FakeTriggerSource()
+    raise ValueError(f"Unknown trigger source: {kind}")
@@ -0,0 +1,98 @@
+import time
+import threading
+
+import config
+import metrics
+from detector_backends import create_backend, create_http_session
+
+
+class InferenceClient:
+    """Process-wide detector shared by every entry point.
+
+    The backend (and its pooled HTTP session) is built once and reused, so repeated
+    gate checks and notebook loops keep their keep-alive connection.
+    """
+
+    def __init__(self, kind=None, retries=config.INFERENCE_RETRIES, backoff=config.INFERENCE_BACKOFF,
+                 keepalive_interval=config.INFERENCE_KEEPALIVE_INTERVAL, model_id=config.MODEL_ID):
+        self.kind = kind
+        # Default model; a local backend can only ever run this one
+        self.model_id = model_id
+        self.retries = retries
+        self.backoff = backoff
+        self.keepalive_interval = keepalive_interval
+        self.session = None
+        self._backend = None
+        self._lock = threading.Lock()
+        self._keepalive_thread = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self.session = create_http_session()
+                    self._backend = create_backend(self.kind, model_id=self.model_id, session=self.session)
+        return self._backend
+
+    def infer(self, image, model_id=None):
+        """Run inference with retry and exponential backoff; re-raises the last error."""
+        return self.infer_timed(image, model_id)[0]
+
+    def infer_timed(self, image, model_id=None):
+        """infer(), also returning the seconds of the attempt that succeeded (failed attempts and backoff left out)."""
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                backend = self.backend
+                # Every failed attempt counts in inference_errors_total
+                with metrics.span("inference"):
+                    start = time.perf_counter()
+                    result = backend.infer(image, model_id)
+                    return result, time.perf_counter() - start
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                metrics.inc("inference_retries")
+                print(f"⚠️ Inference attempt {attempt + 1} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                delay *= 2
+
+    def warm_up(self, background=True):
+        if background:
+            threading.Thread(target=self.warm_up, args=(False,), daemon=True).start()
+            return
+        start = time.time()
+        try:
+            self.backend.warm_up()
+            print(f"🔥 Inference backend warmed up in {time.time() - start:.2f}s")
+        except Exception as e:
+            print(f"⚠️ Inference warm-up failed: {e}")
+        self._start_keepalive()
+
+    def _start_keepalive(self):
+        if self.keepalive_interval <= 0 or self._keepalive_thread is not None:
+            return
+        self._keepalive_thread = threading.Thread(target=self._keepalive_loop, daemon=True)
+        self._keepalive_thread.start()
+
+    def _keepalive_loop(self):
+        while True:
+            time.sleep(self.keepalive_interval)
+            try:
+                self.backend.ping()
+            except Exception:
+                pass
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = InferenceClient()
+    return _client
@@ -0,0 +1,107 @@
+import time
+import threading
+from collections import deque
+
+import config
+import metrics
+from metrics import percentile
+from gate_triggers import create_trigger_source
+from frame_quality import FrameQualityGate
+from compliance_cache import get_compliance_cache
+
+
+class Lane:
+    """One turnstile: its QR/PPE cameras, its Firebase flag paths and its trigger listener.
+
+    Lanes share the process-wide detector, decode pool, write queue and attendance log;
+    only the hardware and the /front, /back, /door_status paths are per lane.
+    """
+
+    def __init__(self, name, qr_front, qr_back, ppe, front_path="/front", back_path="/back",
+                 door_status_path="/door_status", trigger_source=None):
+        self.name = name
+        self.qr_front = qr_front
+        self.qr_back = qr_back
+        self.ppe = ppe
+        self.front_path = front_path
+        self.back_path = back_path
+        self.door_status_path = door_status_path
+        self.triggers = create_trigger_source(trigger_source, refs={"front": front_path, "back": back_path})
+        # Scores this lane's PPE camera frames before they reach the shared detector
+        self.quality = FrameQualityGate()
+        self._tracker = None
+        self.tracker_lock = threading.Lock()
+        self.decision_times = deque(maxlen=500)
+        self.decisions = {"granted": 0, "denied": 0}
+        self.check_started = None
+        self.lock = threading.Lock()
+
+    @property
+    def tracker(self):
+        """Groups PPE boxes by person so only the worker at the gate decides the check.
+
+        Built on first use: tracking imports cv2, and this module is on the app's boot path.
+        """
+        if self._tracker is None:
+            with self.tracker_lock:
+                if self._tracker is None:
+                    from tracking import PersonTracker
+                    self._tracker = PersonTracker()
+        return self._tracker
+
+    @property
+    def camera_indexes(self):
+        return [self.qr_front, self.qr_back, self.ppe]
+
+    def start_check(self):
+        self.check_started = time.perf_counter()
+
+    def record_decision(self, granted):
+        """Time from the PPE check starting to a pass/fail decision, for sizing hardware."""
+        result = "granted" if granted else "denied"
+        metrics.inc("gate_decisions", lane=self.name, result=result)
+        with self.lock:
+            self.decisions[result] += 1
+            if self.check_started is not None:
+                seconds = time.perf_counter() - self.check_started
+                self.decision_times.append(seconds)
+                self.check_started = None
+                metrics.observe("time_to_decision", seconds, lane=self.name)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "decisions": dict(self.decisions),
+                "decision_p50_s": percentile(self.decision_times, 50),
+                "decision_p95_s": percentile(self.decision_times, 95),
+                "quality": self.quality.stats(),
+                "tracking": self.tracker.stats(),
+            }
+
+
+def load_lanes(lanes=config.LANES):
+    names = [lane["name"] for lane in lanes]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Lane names must be unique: {names}")
+    return [Lane(**lane) for lane in lanes]
+
+
+def lane_report(lanes, scheduler):
+    """Decision latency per lane plus its queue wait/service times in the shared inference scheduler."""
+    inference = scheduler.stats()
+    return {lane.name: dict(lane.stats(), inference=inference.get(lane.name, {})) for lane in lanes}
+
+
+def print_lane_report(lanes, scheduler):
+    for name, stats in lane_report(lanes, scheduler).items():
+        inference = stats["inference"]
+        print(f"📈 [{name}] decisions {stats['decisions']}, decision p95 {stats['decision_p95_s']:.1f}s, "
+              f"inference wait p95 {inference.get('wait_p95_ms', 0):.0f} ms, "
+              f"total p95 {inference.get('total_p95_ms', 0):.0f} ms, "
+              f"inference calls saved {stats['quality'].get('inference_saved', 0)}, "
+              f"tracked results reused {stats['tracking']['cache_hits']}")
+    cache = get_compliance_cache()
+    if cache.enabled:
+        stats = cache.stats()
+        print(f"📈 Compliance cache: {stats['hits']} hits, {stats['misses']} misses ({stats['expired']} expired), "
+              f"{stats['evictions']} evictions, {stats['size']} IDs cached")
@@ -0,0 +1,216 @@
+import json
+import time
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sequence of numbers (0.0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+class Histogram:
+    """Count and sum of every observation plus the most recent ones for quantiles.
+
+    Quantiles are computed at scrape time from a bounded window, so observe() is an
+    append under a lock and stays cheap on the hot path.
+    """
+
+    def __init__(self, window=config.METRICS_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.sum += value
+
+    def quantiles(self, qs=(50, 95, 99)):
+        samples = list(self.samples)
+        return {q: percentile(samples, q) for q in qs}
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Registry:
+    """Counters, histograms (as Prometheus summaries) and gauges for the gate pipeline.
+
+    Stages are timed with span(), events counted with inc(); gauges are callables read
+    at scrape time, so components expose queue depths and FPS without a background task.
+    """
+
+    def __init__(self, prefix=config.METRICS_PREFIX):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+
+    def inc(self, name, value=1, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(seconds)
+        if config.METRICS_SLOW_SPAN_MS and seconds * 1000 >= config.METRICS_SLOW_SPAN_MS:
+            log_event("slow_span", stage=name, ms=round(seconds * 1000, 1), **labels)
+
+    def span(self, name, **labels):
+        """with registry.span("qr_decode"): ... records the block's duration in seconds."""
+        return Span(self, name, labels)
+
+    def register_gauge(self, name, fn, label=None):
+        """fn() returns a number, or {label value: number} when label names the label."""
+        with self.lock:
+            self.gauges[name] = (fn, label)
+
+    def snapshot(self):
+        with self.lock:
+            counters = {name: dict(series) for name, series in self.counters.items()}
+            histograms = {name: {key: (h.count, h.sum, h.quantiles()) for key, h in series.items()}
+                          for name, series in self.histograms.items()}
+            gauges = dict(self.gauges)
+        return counters, histograms, gauges
+
+    def render(self):
+        """Prometheus text exposition format."""
+        counters, histograms, gauges = self.snapshot()
+        lines = []
+        for name, series in sorted(counters.items()):
+            metric = f"{self.prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines += [f"{metric}{_format_labels(key)} {value}" for key, value in series.items()]
+        for name, series in sorted(histograms.items()):
+            metric = f"{self.prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for key, (count, total, quantiles) in series.items():
+                for q, value in quantiles.items():
+                    lines.append(f"{metric}{_format_labels(key, [('quantile', q / 100)])} {value:.6f}")
+                lines.append(f"{metric}_sum{_format_labels(key)} {total:.6f}")
+                lines.append(f"{metric}_count{_format_labels(key)} {count}")
+        for name, (fn, label) in sorted(gauges.items()):
+            metric = f"{self.prefix}_{name}"
+            try:
+                value = fn()
+            except Exception as e:
+                print(f"⚠️ Gauge {name} failed: {e}")
+                continue
+            lines.append(f"# TYPE {metric} gauge")
+            if label is None:
+                lines.append(f"{metric} {float(value)}")
+            else:
+                lines += [f"{metric}{_format_labels([(label, k)])} {float(v)}" for k, v in value.items()]
+        return "\n".join(lines) + "\n"
+
+
+class Span:
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        if exc_type is not None:
+            self.registry.inc(f"{self.name}_errors", **self.labels)
+        return False
+
+
+def log_event(event, **fields):
+    """One JSON line per event, for log shippers; off unless METRICS_STRUCTURED_LOGS is set."""
+    if config.METRICS_STRUCTURED_LOGS:
+        print(json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, default=str))
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = Registry()
+    return _registry
+
+
+def span(name, **labels):
+    return get_registry().span(name, **labels)
+
+
+def inc(name, value=1, **labels):
+    get_registry().inc(name, value, **labels)
+
+
+def observe(name, seconds, **labels):
+    get_registry().observe(name, seconds, **labels)
+
+
+def register_gauge(name, fn, label=None):
+    get_registry().register_gauge(name, fn, label)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = get_registry().render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port=None, host=None):
+    """Serve /metrics on a daemon thread; returns the server, or None when METRICS_PORT is 0."""
+    port = config.METRICS_PORT if port is None else port
+    host = config.METRICS_HOST if host is None else host
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"⚠️ Metrics endpoint not started on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"📊 Metrics at http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,24 @@
+import config
+
+
+def get_model(name=None):
+    """Registry entry for a model name (default: ACTIVE_MODEL), with its name filled in."""
+    name = name or config.ACTIVE_MODEL
+    if name not in config.MODELS:
+        raise KeyError(f"Unknown model {name!r}; registered: {', '.join(config.MODELS)}")
+    return dict(config.MODELS[name], name=name)
+
+
+def model_id(name=None):
+    """Roboflow model id for a registry name; anything that is not a registered name is taken as an id already."""
+    if name and name not in config.MODELS:
+        return name
+    return get_model(name)["id"]
+
+
+def model_name(model_id):
+    """Registry name for a model id, or the id itself when it is not registered."""
+    for name, entry in config.MODELS.items():
+        if entry["id"] == model_id:
+            return name
+    return model_id
@@ -0,0 +1,156 @@
+import numpy as np
+
+import config
+
+
+def cxcywh_to_xyxy(boxes):
+    """Roboflow centre/size boxes (N, 4) -> corner boxes (N, 4)."""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    half = boxes[:, 2:] / 2
+    return np.concatenate([boxes[:, :2] - half, boxes[:, :2] + half], axis=1)
+
+
+def xyxy_to_cxcywh(boxes):
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    size = boxes[:, 2:] - boxes[:, :2]
+    return np.concatenate([boxes[:, :2] + size / 2, size], axis=1)
+
+
+def xywh_to_xyxy(boxes):
+    """Pascal VOC style top-left/size boxes -> corner boxes."""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    return np.concatenate([boxes[:, :2], boxes[:, :2] + boxes[:, 2:]], axis=1)
+
+
+def xyxy_to_xywh(boxes):
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    return np.concatenate([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]], axis=1)
+
+
+def box_area(boxes):
+    return np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU of corner boxes a (N, 4) and b (M, 4) -> (N, M)."""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    x0 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y0 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x1 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y1 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+    union = box_area(a)[:, None] + box_area(b)[None, :] - inter
+    return inter / np.maximum(union, 1e-9)
+
+
+class Detections:
+    """Detections of one image as parallel arrays.
+
+    xyxy (N, 4) float32 corner boxes, confidence (N,) float32, class_id (N,) int32
+    indexing into class_names.
+    """
+
+    def __init__(self, xyxy, confidence, class_id, class_names):
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.confidence = np.asarray(confidence, dtype=np.float32).reshape(-1)
+        self.class_id = np.asarray(class_id, dtype=np.int32).reshape(-1)
+        self.class_names = list(class_names)
+
+    @classmethod
+    def empty(cls, class_names=()):
+        return cls(np.zeros((0, 4)), np.zeros(0), np.zeros(0), class_names)
+
+    @classmethod
+    def from_predictions(cls, predictions, class_names=None):
+        """Build from Roboflow-style prediction dicts (or a response containing "predictions")."""
+        if isinstance(predictions, dict):
+            predictions = predictions.get("predictions", [])
+        names = list(class_names or [])
+        index = {name: i for i, name in enumerate(names)}
+        if not predictions:
+            return cls.empty(names)
+        class_id = []
+        for pred in predictions:
+            name = pred["class"]
+            if name not in index:
+                index[name] = len(names)
+                names.append(name)
+            class_id.append(index[name])
+        cxcywh = np.array([[p["x"], p["y"], p["width"], p["height"]] for p in predictions], dtype=np.float32)
+        confidence = np.array([p["confidence"] for p in predictions], dtype=np.float32)
+        return cls(cxcywh_to_xyxy(cxcywh), confidence, class_id, names)
+
+    def __len__(self):
+        return len(self.confidence)
+
+    def __getitem__(self, index):
+        """Subset by boolean mask or index array."""
+        return Detections(self.xyxy[index], self.confidence[index], self.class_id[index], self.class_names)
+
+    @property
+    def labels(self):
+        return [self.class_names[i] for i in self.class_id]
+
+    def present(self):
+        """Set of class names with at least one detection."""
+        return {self.class_names[i] for i in np.unique(self.class_id)}
+
+    def to_predictions(self):
+        cxcywh = xyxy_to_cxcywh(self.xyxy)
+        return [
+            {"x": float(x), "y": float(y), "width": float(w), "height": float(h),
+             "confidence": float(c), "class": self.class_names[k], "class_id": int(k)}
+            for (x, y, w, h), c, k in zip(cxcywh, self.confidence, self.class_id)
+        ]
+
+
+def confidence_mask(detections, thresholds):
+    """Per-class thresholds as {class name: threshold}, with "default" for the rest."""
+    default = thresholds.get("default", 0.0)
+    per_class = np.array([thresholds.get(name, default) for name in detections.class_names] or [default],
+                         dtype=np.float32)
+    return detections.confidence > per_class[detections.class_id]
+
+
+def _greedy_nms(boxes, iou_threshold, block=2048):
+    """NMS over boxes already sorted by descending confidence; returns a keep mask."""
+    n = len(boxes)
+    suppressed = np.zeros(n, dtype=bool)
+    # IoU rows are computed a block at a time against everything after the block,
+    # so memory stays at block * n instead of n * n
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        overlaps = iou_matrix(boxes[start:stop], boxes[start:]) > iou_threshold
+        for row in range(stop - start):
+            i = start + row
+            if not suppressed[i]:
+                hits = overlaps[row, row + 1:]
+                suppressed[i + 1:] |= hits
+    return ~suppressed
+
+
+def nms(detections, iou_threshold, class_aware=True):
+    """Greedy NMS; returns kept indices sorted by descending confidence."""
+    if len(detections) == 0:
+        return np.zeros(0, dtype=np.int64)
+    order = np.argsort(-detections.confidence, kind="stable")
+    if not class_aware:
+        return order[_greedy_nms(detections.xyxy[order], iou_threshold)]
+    keep = np.zeros(len(order), dtype=bool)
+    class_id = detections.class_id[order]
+    for k in np.unique(class_id):
+        members = np.flatnonzero(class_id == k)
+        keep[members[_greedy_nms(detections.xyxy[order[members]], iou_threshold)]] = True
+    return order[keep]
+
+
+def postprocess(result, thresholds=None, iou_threshold=None, class_names=None):
+    """Prediction list/response -> filtered, de-duplicated Detections."""
+    thresholds = config.CONFIDENCE_THRESHOLDS if thresholds is None else thresholds
+    iou_threshold = config.NMS_IOU if iou_threshold is None else iou_threshold
+    detections = Detections.from_predictions(result, class_names)
+    detections = detections[confidence_mask(detections, thresholds)]
+    if iou_threshold < 1.0:
+        detections = detections[nms(detections, iou_threshold)]
+    return detections
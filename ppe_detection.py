@@ -1,67 +1,31 @@
-from inference_sdk import InferenceHTTPClient
-from PIL import Image, ImageDraw, ImageFont
+import cv2
 import matplotlib.pyplot as plt
+from inference_client import get_client
+from postprocess import postprocess
+from annotation import AnnotationRenderer
+from model_registry import model_id
 
 # Load the image
 image_path = "ppe_capture.jpg"
-image = Image.open(image_path).convert("RGB")
+image = cv2.imread(image_path)
 
-# Initialize Roboflow client
-CLIENT = InferenceHTTPClient(
-    api_url="https://serverless.roboflow.com",
-    api_key="ipRXafHM2fxthdHpXUSC"
-)
+# Shared inference client (remote Roboflow, local ONNX or fallback, see config.py)
+CLIENT = get_client()
 
 # Run inference
-result = CLIENT.infer(image_path, model_id="ppe-ukjvg/2")
+# Pinned to the "v2" entry of config.MODELS
+result = CLIENT.infer(image_path, model_id=model_id("v2"))
 
-# Prepare for drawing
-draw = ImageDraw.Draw(image, "RGBA")
+# Confidence filtering and class-aware NMS (thresholds in config.py)
+detections = postprocess(result)
 
-# Fixed colors per class
-class_colors = {
-    "hardhat": (255, 255, 0, 200),     # Yellow
-    "vest": (128, 0, 128, 200),        # Purple
-    "gloves": (255, 0, 0, 200),        # Red
-    "shoes": (0, 255, 255, 200),       # Cyan
-}
-
-# Load font
-try:
-    font = ImageFont.truetype("arial.ttf", 50)
-except:
-    font = ImageFont.load_default()
-
-# Draw predictions
-for pred in result["predictions"]:
-    x0 = pred["x"] - pred["width"] / 2
-    y0 = pred["y"] - pred["height"] / 2
-    x1 = x0 + pred["width"]
-    y1 = y0 + pred["height"]
-    label = f"{pred['class']} ({pred['confidence']:.2f})"
-
-    # Get color by class, fallback to white
-    color = class_colors.get(pred["class"], (255, 255, 255, 200))
-
-    # Draw thicker bounding box (20px)
-    for offset in range(5):
-        draw.rectangle([x0 - offset, y0 - offset, x1 + offset, y1 + offset], outline=color[:3])
-
-    # Calculate text background box
-    text_bbox = draw.textbbox((x0, y0), label, font=font)
-    text_x0, text_y0, text_x1, text_y1 = text_bbox
-    text_height = text_y1 - text_y0
-    text_width = text_x1 - text_x0
-
-    # Draw background for label
-    draw.rectangle([x0, y0 - text_height - 10, x0 + text_width + 10, y0], fill=color)
-
-    # Draw label text
-    draw.text((x0 + 5, y0 - text_height - 5), label, fill=(255, 255, 255), font=font)
+# Same renderer as the gate app, with thicker boxes and bigger labels for a full-size photo
+renderer = AnnotationRenderer(font_size=50, thickness=5)
+renderer.draw(image, detections)
 
 # Show result
 plt.figure(figsize=(12, 10))
-plt.imshow(image)
+plt.imshow(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
 plt.axis("off")
 plt.title("Detected Objects (Color-Coded)", fontsize=18)
 plt.tight_layout()
@@ -0,0 +1,121 @@
+import time
+import threading
+from collections import deque
+
+import cv2
+
+import config
+import metrics
+from postprocess import postprocess
+
+REQUIRED_PPE = ("hardhat", "vest", "gloves")
+
+
+class ComplianceWindow:
+    """Per-class detections over the last few inferred frames.
+
+    Compliant once every required class has been detected (after confidence filtering
+    and NMS) in at least min_hits of the last window frames, so one missed frame does
+    not reset the check and one spurious box does not pass it.
+    """
+
+    def __init__(self, window=config.STREAM_WINDOW, min_hits=config.STREAM_MIN_HITS, required=REQUIRED_PPE):
+        self.frames = deque(maxlen=window)
+        self.min_hits = min_hits
+        self.required = required
+
+    def add(self, detections):
+        seen = detections.present()
+        self.frames.append(seen)
+        return seen
+
+    def hits(self):
+        return {name: sum(name in seen for seen in self.frames) for name in self.required}
+
+    def flags(self):
+        return {name: int(count >= self.min_hits) for name, count in self.hits().items()}
+
+    def is_compliant(self):
+        return all(self.flags().values())
+
+    def reset(self):
+        self.frames.clear()
+
+
+class StreamingPPEChecker:
+    """Sends PPE camera frames to the detector at a fixed rate until the window is compliant.
+
+    on_result(frame, detections, window) is called on the checker thread after every
+    inference, on_compliant(frame, detections, window) once when access can be granted.
+    With a quality gate, each inference goes to the best frame buffered since the last
+    one, and a tick whose frames are all rejected skips the detector (on_rejected(score)).
+    With a person tracker, window is the compliance window of the person nearest the gate.
+    """
+
+    def __init__(self, camera, detector, on_result=None, on_compliant=None,
+                 rate=config.STREAM_INFER_FPS, window=None, prepare=None, quality=None, on_rejected=None,
+                 tracker=None):
+        self.camera = camera
+        self.detector = detector
+        self.quality = quality
+        self.on_rejected = on_rejected
+        self.tracker = tracker
+        self.no_person = ComplianceWindow()
+        self.on_result = on_result
+        self.on_compliant = on_compliant
+        self.interval = 1.0 / rate
+        self.window = window or ComplianceWindow()
+        # Orientation the detector expects, same as the countdown snapshot
+        self.prepare = prepare or (lambda frame: cv2.rotate(frame, cv2.ROTATE_90_COUNTERCLOCKWISE))
+        self.running = False
+        self.thread = None
+        self.errors = 0
+
+    def start(self):
+        self.running = True
+        self.window.reset()
+        self.thread = threading.Thread(target=self._run, name="ppe-stream", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+
+    def _run(self):
+        seq = 0
+        while self.running:
+            started = time.monotonic()
+            seq, frame = self.camera.wait_for_frame(seq)
+            if frame is None or not self.running:
+                continue
+            if self.quality is not None:
+                frame, score = self.quality.best(self.camera.recent())
+                if frame is None:
+                    if self.on_rejected:
+                        self.on_rejected(score)
+                    time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+                    continue
+            frame = self.prepare(frame)
+            try:
+                with metrics.span("ppe_stream_check"):
+                    detections = postprocess(self.detector.infer(frame))
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Streaming inference failed: {e}")
+                time.sleep(self.interval)
+                continue
+            if self.tracker is not None:
+                track = self.tracker.update(detections, frame)
+                self.window = track.window if track is not None else self.no_person
+            else:
+                self.window.add(detections)
+            if not self.running:
+                return
+            if self.on_result:
+                self.on_result(frame, detections, self.window)
+            if self.window.is_compliant():
+                self.running = False
+                if self.on_compliant:
+                    self.on_compliant(frame, detections, self.window)
+                return
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
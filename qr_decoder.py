@@ -0,0 +1,122 @@
+import time
+import threading
+from collections import Counter, deque, namedtuple
+
+import cv2
+from pyzbar import pyzbar
+
+import config
+import metrics
+from metrics import percentile
+from scheduler import FairQueue
+
+DecodeResult = namedtuple("DecodeResult", ["seq", "data", "mode", "decode_time", "decoded_at"])
+
+
+class QRDecodePool:
+    """Decodes QR codes off the UI thread.
+
+    Frames are queued with submit(); workers try the cheap modes first (centre crop,
+    downscaled grayscale) and only fall back to the full-resolution frame when those
+    find nothing. Results are handed to the submitter's callback on the worker thread.
+    Each gate lane has its own small queue, served round-robin.
+    """
+
+    def __init__(self, workers=config.QR_DECODE_WORKERS, decode_every=config.QR_DECODE_EVERY,
+                 modes=config.QR_DECODE_MODES, queue_size=config.QR_QUEUE_SIZE):
+        self.decode_every = max(1, decode_every)
+        self.modes = modes
+        self.queue = FairQueue(queue_size)
+        self.submitted = Counter()
+        self.skipped = 0
+        self.decode_times = deque(maxlen=500)
+        self.write_latencies = deque(maxlen=500)
+        self.hits = {mode: 0 for mode in modes}
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"qr-decode-{i}", daemon=True).start()
+        metrics.register_gauge("qr_queue_depth", self.queue.qsize)
+
+    def submit(self, frame, seq, callback, lane=None):
+        """Queue a BGR frame for decoding; never blocks. Returns False if the frame was skipped."""
+        self.submitted[lane] += 1
+        if self.submitted[lane] % self.decode_every:
+            return False
+        # Stale work is worthless for a live scanner: a full lane drops its oldest job for this one
+        if self.queue.put(lane, (frame, seq, callback)) is not None:
+            self.skipped += 1
+            metrics.inc("qr_frames_skipped")
+        return True
+
+    def _candidates(self, gray):
+        h, w = gray.shape[:2]
+        for mode in self.modes:
+            if mode == "roi":
+                fraction = config.QR_ROI_FRACTION
+                crop_h, crop_w = int(h * fraction), int(w * fraction)
+                y0, x0 = (h - crop_h) // 2, (w - crop_w) // 2
+                yield mode, gray[y0:y0 + crop_h, x0:x0 + crop_w]
+            elif mode == "downscale":
+                if w > config.QR_DOWNSCALE_WIDTH:
+                    scale = config.QR_DOWNSCALE_WIDTH / w
+                    yield mode, cv2.resize(gray, (config.QR_DOWNSCALE_WIDTH, int(h * scale)),
+                                           interpolation=cv2.INTER_AREA)
+            elif mode == "full":
+                yield mode, gray
+
+    def decode(self, frame):
+        """Return (list of decoded strings, mode that found them)."""
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        for mode, image in self._candidates(gray):
+            barcodes = pyzbar.decode(image)
+            if barcodes:
+                return [barcode.data.decode('utf-8') for barcode in barcodes], mode
+        return [], None
+
+    def _worker(self):
+        while True:
+            _, (frame, seq, callback), _ = self.queue.get()
+            start = time.perf_counter()
+            try:
+                data, mode = self.decode(frame)
+            except Exception as e:
+                print(f"⚠️ QR decode failed: {e}")
+                metrics.inc("qr_decode_errors")
+                continue
+            decode_time = time.perf_counter() - start
+            self.decode_times.append(decode_time)
+            metrics.observe("qr_decode", decode_time, mode=mode or "none")
+            if data:
+                self.hits[mode] += 1
+                callback(DecodeResult(seq, data, mode, decode_time, time.time()))
+
+    def record_write(self, result):
+        """Record decode-to-Firebase-write latency for a result once its write has completed."""
+        latency = time.time() - result.decoded_at
+        self.write_latencies.append(latency)
+        metrics.observe("qr_to_firebase", latency)
+        print(f"⏱️ QR decode→Firebase write: {latency * 1000:.0f} ms (decode {result.decode_time * 1000:.0f} ms, {result.mode})")
+
+    def stats(self):
+        return {
+            "submitted": sum(self.submitted.values()),
+            "skipped": self.skipped,
+            "queue_depth": self.queue.qsize(),
+            "hits": dict(self.hits),
+            "decode_p50_ms": percentile(self.decode_times, 50) * 1000,
+            "decode_p95_ms": percentile(self.decode_times, 95) * 1000,
+            "write_p50_ms": percentile(self.write_latencies, 50) * 1000,
+            "write_p95_ms": percentile(self.write_latencies, 95) * 1000,
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_decode_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = QRDecodePool()
+    return _pool
@@ -0,0 +1,165 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+import config
+import metrics
+from metrics import percentile
+
+
+class FairQueue:
+    """Per-lane bounded queues served round-robin, so one busy lane cannot starve the others.
+
+    A full lane drops its own oldest item (stale frames are worthless to a live gate);
+    put() returns the dropped item so the caller can account for it.
+    """
+
+    def __init__(self, depth):
+        self.depth = max(1, depth)
+        self.queues = {}
+        self.lanes = []
+        self.next = 0
+        self.cond = threading.Condition()
+
+    def put(self, lane, item):
+        with self.cond:
+            q = self.queues.get(lane)
+            if q is None:
+                q = self.queues[lane] = deque()
+                self.lanes.append(lane)
+            dropped = q.popleft()[1] if len(q) >= self.depth else None
+            q.append((time.perf_counter(), item))
+            self.cond.notify()
+        return dropped
+
+    def get(self):
+        """Block until any lane has work; returns (lane, item, seconds waited)."""
+        with self.cond:
+            while True:
+                for step in range(len(self.lanes)):
+                    i = (self.next + step) % len(self.lanes)
+                    q = self.queues[self.lanes[i]]
+                    if q:
+                        self.next = i + 1
+                        queued_at, item = q.popleft()
+                        return self.lanes[i], item, time.perf_counter() - queued_at
+                self.cond.wait()
+
+    def qsize(self, lane=None):
+        with self.cond:
+            if lane is not None:
+                return len(self.queues.get(lane, ()))
+            return sum(len(q) for q in self.queues.values())
+
+
+class LaneStats:
+    def __init__(self):
+        self.submitted = 0
+        self.dropped = 0
+        self.completed = 0
+        self.errors = 0
+        self.wait_times = deque(maxlen=500)
+        self.service_times = deque(maxlen=500)
+
+    def summary(self):
+        total = [w + s for w, s in zip(self.wait_times, self.service_times)]
+        return {
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "completed": self.completed,
+            "errors": self.errors,
+            "wait_p50_ms": percentile(self.wait_times, 50) * 1000,
+            "wait_p95_ms": percentile(self.wait_times, 95) * 1000,
+            "service_p50_ms": percentile(self.service_times, 50) * 1000,
+            "service_p95_ms": percentile(self.service_times, 95) * 1000,
+            "total_p95_ms": percentile(total, 95) * 1000,
+        }
+
+
+class LaneScheduler:
+    """Runs calls from several gate lanes on one shared worker pool with fair queuing.
+
+    submit(lane, fn, *args) returns a Future; a lane that floods the scheduler only
+    displaces its own oldest pending call (cancelled), never another lane's.
+    """
+
+    def __init__(self, workers=config.LANE_INFERENCE_WORKERS, depth=config.LANE_QUEUE_DEPTH, name="lane"):
+        self.queue = FairQueue(depth)
+        self.lane_stats = {}
+        self.lock = threading.Lock()
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True).start()
+        metrics.register_gauge(f"{name.replace('-', '_')}_queue_depth",
+                               lambda: {lane: self.queue.qsize(lane) for lane in list(self.lane_stats)}, label="lane")
+
+    def _stats(self, lane):
+        with self.lock:
+            stats = self.lane_stats.get(lane)
+            if stats is None:
+                stats = self.lane_stats[lane] = LaneStats()
+            return stats
+
+    def submit(self, lane, fn, *args):
+        future = Future()
+        stats = self._stats(lane)
+        stats.submitted += 1
+        dropped = self.queue.put(lane, (future, fn, args))
+        if dropped is not None:
+            stats.dropped += 1
+            metrics.inc("lane_calls_dropped", lane=lane)
+            dropped[0].cancel()
+        return future
+
+    def _worker(self):
+        while True:
+            lane, (future, fn, args), waited = self.queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            stats = self._stats(lane)
+            metrics.observe("lane_queue_wait", waited, lane=lane)
+            start = time.perf_counter()
+            try:
+                result = fn(*args)
+            except Exception as e:
+                stats.errors += 1
+                future.set_exception(e)
+                continue
+            stats.wait_times.append(waited)
+            stats.service_times.append(time.perf_counter() - start)
+            stats.completed += 1
+            future.set_result(result)
+
+    def detector(self, lane, client):
+        """A detector for one lane whose infer() goes through this scheduler."""
+        return LaneDetector(self, lane, client)
+
+    def stats(self):
+        with self.lock:
+            lanes = dict(self.lane_stats)
+        return {lane: dict(stats.summary(), queue_depth=self.queue.qsize(lane)) for lane, stats in lanes.items()}
+
+
+class LaneDetector:
+    """Drop-in for the inference client (same infer signature) that queues fairly per lane."""
+
+    def __init__(self, scheduler, lane, client):
+        self.scheduler = scheduler
+        self.lane = lane
+        self.client = client
+
+    def infer(self, image, model_id=None):
+        return self.scheduler.submit(self.lane, self.client.infer, image, model_id).result()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_inference_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LaneScheduler(name="lane-infer")
+    return _scheduler
@@ -0,0 +1,255 @@
+"""Shadow-mode A/B comparison of a candidate model against the active one on live gate traffic.
+
+    python shadow.py report                 # every model pair in SHADOW_DB_PATH
+    python shadow.py report --since 24      # last 24 hours only
+"""
+import time
+import queue
+import random
+import sqlite3
+import argparse
+import threading
+
+import numpy as np
+
+import config
+import metrics
+from metrics import percentile
+from model_registry import model_id, model_name
+from postprocess import postprocess, iou_matrix
+from ppe_stream import REQUIRED_PPE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    lane TEXT,
+    primary_model TEXT NOT NULL,
+    candidate_model TEXT NOT NULL,
+    primary_ms REAL NOT NULL,
+    candidate_ms REAL,                -- NULL when the candidate call failed
+    primary_compliant INTEGER NOT NULL,
+    candidate_compliant INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS samples_models_ts ON samples (primary_model, candidate_model, ts);
+
+CREATE TABLE IF NOT EXISTS sample_classes (
+    sample_id INTEGER NOT NULL REFERENCES samples (id),
+    class TEXT NOT NULL,
+    primary_count INTEGER NOT NULL,
+    candidate_count INTEGER NOT NULL,
+    agree INTEGER NOT NULL,           -- both models saw the class, or neither did
+    mean_iou REAL,                    -- best same-class candidate IoU per primary box, averaged
+    PRIMARY KEY (sample_id, class)
+);
+"""
+
+
+def compare(primary, candidate, classes=REQUIRED_PPE):
+    """Per class (primary count, candidate count, agree, mean IoU or None) for two post-processed results."""
+    primary_labels = np.array(primary.labels, dtype=object)
+    candidate_labels = np.array(candidate.labels, dtype=object)
+    out = {}
+    for name in classes:
+        p = primary.xyxy[primary_labels == name]
+        c = candidate.xyxy[candidate_labels == name]
+        mean_iou = float(iou_matrix(p, c).max(axis=1).mean()) if len(p) and len(c) else None
+        out[name] = (len(p), len(c), int(bool(len(p)) == bool(len(c))), mean_iou)
+    return out
+
+
+class ShadowStore:
+    """Local SQLite log of shadow comparisons, one row per sampled frame plus one per class."""
+
+    def __init__(self, path=config.SHADOW_DB_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def record(self, primary_model, candidate_model, primary_seconds, candidate_seconds, primary, candidate,
+               lane=None, error=None, ts=None):
+        """primary/candidate are Detections; candidate is None (and error set) when its call failed."""
+        primary_compliant = int(primary.present() >= set(REQUIRED_PPE))
+        candidate_compliant = None if candidate is None else int(candidate.present() >= set(REQUIRED_PPE))
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO samples (ts, lane, primary_model, candidate_model, primary_ms, candidate_ms, "
+                "primary_compliant, candidate_compliant, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (ts or time.time(), lane, primary_model, candidate_model, primary_seconds * 1000,
+                 None if candidate_seconds is None else candidate_seconds * 1000,
+                 primary_compliant, candidate_compliant, error))
+            if candidate is not None:
+                self.conn.executemany(
+                    "INSERT INTO sample_classes (sample_id, class, primary_count, candidate_count, agree, mean_iou) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(cursor.lastrowid, name, *values) for name, values in compare(primary, candidate).items()])
+            return cursor.lastrowid
+
+    def report(self, since=None):
+        """Latency percentiles and disagreement rates per (primary, candidate) pair, oldest pair first."""
+        since = since or 0
+        rows = []
+        with self.lock:
+            pairs = self.conn.execute(
+                "SELECT primary_model, candidate_model, COUNT(*) AS samples, SUM(error IS NOT NULL) AS errors, "
+                "MIN(ts) AS first FROM samples WHERE ts >= ? GROUP BY primary_model, candidate_model ORDER BY first",
+                (since,)).fetchall()
+            for pair in pairs:
+                key = (pair["primary_model"], pair["candidate_model"], since)
+                latencies = self.conn.execute(
+                    "SELECT primary_ms, candidate_ms, primary_compliant, candidate_compliant FROM samples "
+                    "WHERE primary_model = ? AND candidate_model = ? AND ts >= ?", key).fetchall()
+                compared = [r for r in latencies if r["candidate_ms"] is not None]
+                classes = self.conn.execute(
+                    "SELECT class, COUNT(*) AS n, 1.0 - AVG(agree) AS disagreement, AVG(mean_iou) AS mean_iou "
+                    "FROM sample_classes JOIN samples ON samples.id = sample_id "
+                    "WHERE primary_model = ? AND candidate_model = ? AND ts >= ? GROUP BY class ORDER BY class",
+                    key).fetchall()
+                rows.append({
+                    "primary": pair["primary_model"],
+                    "candidate": pair["candidate_model"],
+                    "samples": pair["samples"],
+                    "errors": pair["errors"],
+                    "primary_p95_ms": percentile([r["primary_ms"] for r in latencies], 95),
+                    "candidate_p95_ms": percentile([r["candidate_ms"] for r in compared], 95),
+                    "decision_disagreement": (sum(r["primary_compliant"] != r["candidate_compliant"] for r in compared)
+                                              / len(compared) if compared else 0.0),
+                    "classes": {r["class"]: {"disagreement": r["disagreement"], "mean_iou": r["mean_iou"]}
+                                for r in classes},
+                })
+        return rows
+
+
+class ShadowRunner:
+    """Sends a sampled fraction of live PPE frames to a candidate model on its own thread.
+
+    offer() never blocks the gate: it samples, then drops the frame if the queue is full.
+    The candidate goes through its own client (SHADOW_BACKEND), so a slow candidate does
+    not hold the gate's connection pool or its retries.
+    """
+
+    def __init__(self, candidate=config.SHADOW_MODEL, rate=config.SHADOW_SAMPLE_RATE, client=None, store=None,
+                 queue_size=config.SHADOW_QUEUE_SIZE, rng=random.random):
+        self.candidate = model_id(candidate)
+        self.rate = rate
+        self.client = client
+        self.store = store or ShadowStore()
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.rng = rng
+        self.counts = {"offered": 0, "sampled": 0, "dropped": 0, "compared": 0, "errors": 0}
+        self.thread = None
+        metrics.register_gauge("shadow_queue_depth", self.queue.qsize)
+
+    def start(self):
+        if self.client is None:
+            from inference_client import InferenceClient
+            self.client = InferenceClient(kind=config.SHADOW_BACKEND, retries=0, keepalive_interval=0,
+                                          model_id=self.candidate)
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="shadow", daemon=True)
+            self.thread.start()
+            print(f"👥 Shadow mode: {self.rate:.0%} of PPE frames also go to {self.candidate}")
+        return self
+
+    def offer(self, image, result, seconds, primary_model=None, lane=None):
+        self.counts["offered"] += 1
+        if self.rng() >= self.rate:
+            return False
+        try:
+            self.queue.put_nowait((image, result, seconds, primary_model or config.MODEL_ID, lane))
+        except queue.Full:
+            self.counts["dropped"] += 1
+            metrics.inc("shadow_dropped")
+            return False
+        self.counts["sampled"] += 1
+        return True
+
+    def _run(self):
+        while True:
+            image, result, seconds, primary_model, lane = self.queue.get()
+            candidate, candidate_seconds, error = None, None, None
+            try:
+                raw, candidate_seconds = self.client.infer_timed(image, self.candidate)
+                candidate = postprocess(raw)
+                metrics.observe("shadow_inference", candidate_seconds, model=model_name(self.candidate))
+            except Exception as e:
+                error = str(e)
+                self.counts["errors"] += 1
+            try:
+                self.store.record(primary_model, self.candidate, seconds, candidate_seconds, postprocess(result),
+                                  candidate, lane=lane, error=error)
+                self.counts["compared"] += 1
+            except Exception as e:
+                print(f"⚠️ Shadow comparison not recorded: {e}")
+
+    def stats(self):
+        return dict(self.counts, queue_depth=self.queue.qsize())
+
+
+class ShadowDetector:
+    """Wraps a lane's inference client: the gate gets the active model's result untouched, a sample is mirrored.
+
+    It goes inside the lane scheduler, and both sides are timed on the backend call that
+    succeeded, so the primary's latency leaves out queue waits, retries and backoff,
+    which the candidate never has.
+    """
+
+    def __init__(self, client, runner, lane=None):
+        self.client = client
+        self.runner = runner
+        self.lane = lane
+
+    def infer(self, image, model_id=None):
+        result, seconds = self.client.infer_timed(image, model_id)
+        self.runner.offer(image, result, seconds, model_id, self.lane)
+        return result
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_shadow_runner():
+    """Process-wide runner for config.SHADOW_MODEL, started on first use; None when shadow mode is off."""
+    global _runner
+    if not config.SHADOW_MODEL:
+        return None
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = ShadowRunner().start()
+    return _runner
+
+
+def print_report(rows):
+    if not rows:
+        print("No shadow samples recorded yet.")
+        return
+    for row in rows:
+        print(f"\n=== {model_name(row['primary'])} ({row['primary']}) vs "
+              f"{model_name(row['candidate'])} ({row['candidate']}) ===")
+        print(f"samples {row['samples']}, candidate errors {row['errors']}")
+        print(f"p95 latency: primary {row['primary_p95_ms']:.0f} ms, candidate {row['candidate_p95_ms']:.0f} ms")
+        print(f"gate decision disagreement: {row['decision_disagreement']:.1%}")
+        for name, values in row["classes"].items():
+            iou = "-" if values["mean_iou"] is None else f"{values['mean_iou']:.2f}"
+            print(f"  {name:<10} disagreement {values['disagreement']:.1%}  mean IoU {iou}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["report"])
+    parser.add_argument("--db", default=config.SHADOW_DB_PATH)
+    parser.add_argument("--since", type=float, help="only the last N hours")
+    args = parser.parse_args()
+    since = time.time() - args.since * 3600 if args.since else None
+    print_report(ShadowStore(args.db).report(since))
+
+
+if __name__ == "__main__":
+    main()
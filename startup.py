@@ -0,0 +1,207 @@
+import json
+import time
+import threading
+
+import config
+import metrics
+
+# Taken when the app first imports this module, before Kivy, so the boot time covers the window too
+BOOT_STARTED = time.perf_counter()
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+STATUS_MARKS = {PENDING: "…", READY: "✓", FAILED: "✗"}
+
+
+class Startup:
+    """Initialises the gate's subsystems concurrently and tracks each one's readiness.
+
+    Every subsystem runs on its own thread once the subsystems it depends on are ready;
+    listeners hear about each change so the idle screen can show progress while it waits.
+    """
+
+    def __init__(self, started=BOOT_STARTED):
+        self.started = started
+        self.steps = {}
+        self.status = {}
+        self.results = {}
+        self.errors = {}
+        self.seconds = {}
+        self.events = {}
+        self.listeners = []
+        self.lock = threading.Lock()
+        metrics.register_gauge("startup_ready", lambda: {
+            name: int(state == READY) for name, state in self.status.items()}, label="subsystem")
+
+    def add(self, name, fn, after=()):
+        """fn(*results of after) runs once every subsystem named in after is ready."""
+        self.steps[name] = (fn, tuple(after))
+        self.status[name] = PENDING
+        self.events[name] = threading.Event()
+
+    def add_listener(self, callback):
+        """callback(name) is called from the subsystem's thread whenever its status changes."""
+        self.listeners.append(callback)
+
+    def start(self):
+        for name in self.steps:
+            threading.Thread(target=self._run, args=(name,), name=f"startup-{name}", daemon=True).start()
+        return self
+
+    def _run(self, name):
+        fn, after = self.steps[name]
+        for dependency in after:
+            self.events[dependency].wait()
+        missing = [dependency for dependency in after if self.status[dependency] != READY]
+        if missing:
+            self._finish(name, FAILED, error=f"needs {', '.join(missing)}")
+            return
+        start = time.perf_counter()
+        try:
+            result = fn(*(self.results[dependency] for dependency in after))
+        except Exception as e:
+            print(f"❌ Startup: {name} failed: {e}")
+            self._finish(name, FAILED, error=str(e))
+            return
+        self.results[name] = result
+        self._finish(name, READY, seconds=time.perf_counter() - start)
+
+    def _finish(self, name, state, seconds=None, error=None):
+        with self.lock:
+            self.status[name] = state
+            if seconds is not None:
+                self.seconds[name] = seconds
+                metrics.observe("startup", seconds, subsystem=name)
+            if error is not None:
+                self.errors[name] = error
+            done = all(s != PENDING for s in self.status.values())
+        self.events[name].set()
+        if state == READY:
+            print(f"✅ Startup: {name} ready in {seconds:.2f}s ({self.elapsed():.2f}s since boot)")
+        for callback in self.listeners:
+            callback(name)
+        if done:
+            self.report()
+
+    def mark(self, name):
+        """Record a milestone (e.g. the first frame on screen) as seconds since boot."""
+        with self.lock:
+            self.seconds[name] = self.elapsed()
+        print(f"⏱️ Startup: {name} after {self.seconds[name]:.2f}s")
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def ready(self, name=None):
+        if name is not None:
+            return self.status.get(name) == READY
+        return all(state == READY for state in self.status.values())
+
+    def wait(self, names=None, timeout=None):
+        """Block until the named subsystems (default: all) have finished, ready or not."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for name in names or list(self.steps):
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self.events[name].wait(remaining):
+                return False
+        return all(self.status[name] == READY for name in names or self.steps)
+
+    def status_text(self):
+        return "\n".join(f"{STATUS_MARKS[state]} {name}" + (f" ({self.errors[name]})" if name in self.errors else "")
+                         for name, state in self.status.items())
+
+    def report(self):
+        total = self.elapsed()
+        metrics.observe("boot", total)
+        parts = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.seconds.items())
+        failed = [name for name, state in self.status.items() if state == FAILED]
+        print(f"🚀 Boot {'finished' if not failed else 'incomplete'} in {total:.2f}s: {parts}"
+              + (f" (failed: {', '.join(failed)})" if failed else ""))
+        if config.STARTUP_LOG_PATH:
+            entry = {"ts": round(time.time(), 3), "boot_seconds": round(total, 3),
+                     "subsystems": {name: round(seconds, 3) for name, seconds in self.seconds.items()},
+                     "failed": failed}
+            try:
+                with open(config.STARTUP_LOG_PATH, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print(f"⚠️ Could not append to {config.STARTUP_LOG_PATH}: {e}")
+
+
+# --- Gate subsystems (heavy imports happen here, on the startup threads) ---
+
+def start_firebase():
+    from firebase_writer import get_firebase_writer, init_firebase
+    from attendance_store import get_attendance_store
+    init_firebase()
+    writer = get_firebase_writer()
+    writer.start()
+    attendance = get_attendance_store()
+    attendance.start_sync(writer)
+    return writer, attendance
+
+
+def open_cameras(lanes, timeout=config.STARTUP_CAMERA_TIMEOUT):
+    from camera_manager import get_camera_manager
+    cameras = get_camera_manager()
+    indexes = [index for lane in lanes for index in lane.camera_indexes]
+    cameras.open_all(indexes)
+    # Wait out the driver's first frame here rather than in the first scan
+    for index in indexes:
+        if cameras.get(index).wait_for_frame(0, timeout)[1] is None:
+            print(f"⚠️ Camera {index}: no frame after {timeout}s")
+    return cameras
+
+
+def start_inference():
+    from inference_client import get_client
+    from scheduler import get_inference_scheduler
+    from annotation import get_renderer
+    # Engine imports and the renderer's font and label badges are paid now, not by the first PPE check
+    import gate_engine  # noqa: F401
+    get_renderer()
+    client = get_client()
+    client.warm_up(background=False)
+    return client, get_inference_scheduler()
+
+
+def start_qr_decoder():
+    from qr_decoder import get_decode_pool
+    return get_decode_pool()
+
+
+def start_audio():
+    from audio import get_audio_prompts
+    return get_audio_prompts()
+
+
+def add_gate_services(boot, lanes, timings=None):
+    """Register every subsystem the gate needs; the "gate" result is one GateEngine per lane."""
+    boot.add("firebase", start_firebase)
+    boot.add("cameras", lambda: open_cameras(lanes))
+    boot.add("inference", start_inference)
+    boot.add("qr", start_qr_decoder)
+    boot.add("audio", start_audio)
+
+    def build_engines(firebase, cameras, inference, qr_decoder, audio):
+        from gate_engine import GateEngine
+        from shadow import ShadowDetector, get_shadow_runner
+        writer, attendance = firebase
+        client, scheduler = inference
+        shadow = get_shadow_runner()
+        engines = []
+        for lane in lanes:
+            lane_client = client
+            if shadow is not None:
+                # A sample of this lane's PPE frames also goes to the candidate model; the gate never waits on it.
+                # Wrapped inside the scheduler so the primary is timed like the candidate, without the queue wait
+                lane_client = ShadowDetector(client, shadow, lane.name)
+            detector = scheduler.detector(lane.name, lane_client)
+            engine = GateEngine(lane, detector, cameras, qr_decoder, writer, attendance, timings=timings)
+            engine.add_listener(audio.on_gate_event)
+            engines.append(engine)
+        return engines
+
+    boot.add("gate", build_engines, after=("firebase", "cameras", "inference", "qr", "audio"))
+    return boot
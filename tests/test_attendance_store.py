@@ -0,0 +1,42 @@
+from attendance_store import AttendanceStore, firebase_key
+
+# Characters Firebase Realtime Database rejects in a key
+FIREBASE_FORBIDDEN_KEY_CHARS = ".$#[]/"
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.paths = []
+
+    def set(self, path, value, callback=None):
+        self.paths.append(path)
+        if callback:
+            callback()
+
+
+def test_firebase_keys_are_legal(tmp_path):
+    store = AttendanceStore(str(tmp_path / "attendance.db"))
+    for i in range(3):
+        store.record_scan(f"ID-{i}", "in", ts=1760779939.5)
+    writer = RecordingWriter()
+    assert store.sync(writer, path="DWS-In-Out") == 3
+    keys = [path.split("/", 1)[1] for path in writer.paths]
+    assert len(set(keys)) == 3
+    for key in keys:
+        assert not set(key) & set(FIREBASE_FORBIDDEN_KEY_CHARS), key
+
+
+def test_firebase_key_format():
+    key = firebase_key({"ts": 1760779939.0, "id": 12})
+    assert key.endswith("_12")
+    assert not set(key) & set(FIREBASE_FORBIDDEN_KEY_CHARS)
+
+
+def test_sync_callback_registered_with_the_row(tmp_path):
+    store = AttendanceStore(str(tmp_path / "attendance.db"))
+    synced = []
+    event_id = store.record_scan("ID-1", "in", on_synced=lambda: synced.append("ID-1"))
+    # The sync thread may pick the row up before record_scan's caller runs again
+    assert store.sync(RecordingWriter()) == 1
+    assert synced == ["ID-1"]
+    assert event_id not in store.sync_callbacks
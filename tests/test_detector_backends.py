@@ -0,0 +1,59 @@
+import importlib
+
+import pytest
+
+import config
+from detector_backends import FallbackBackend, LocalONNXBackend, RoboflowHTTPBackend, create_backend
+
+
+@pytest.fixture
+def active_v2(monkeypatch):
+    monkeypatch.setenv("PPE_MODEL", "v2")
+    monkeypatch.delenv("PPE_LOCAL_MODEL", raising=False)
+    importlib.reload(config)
+    yield
+    monkeypatch.undo()
+    importlib.reload(config)
+
+
+def test_model_without_export_has_no_local_model(active_v2):
+    assert config.MODEL_ID == "ppe-ukjvg/2"
+    assert config.LOCAL_MODEL_PATH is None
+    assert config.LOCAL_MODEL_CLASSES is None
+
+
+def test_local_backend_refuses_another_models_export():
+    with pytest.raises(ValueError, match="no local export"):
+        LocalONNXBackend.for_model("ppe-ukjvg/2")
+
+
+def test_fallback_runs_remote_only_without_export(capsys):
+    backend = create_backend("fallback", model_id="ppe-ukjvg/2")
+    assert isinstance(backend, RoboflowHTTPBackend)
+    assert "no fallback" in capsys.readouterr().out
+
+
+class Stub:
+    name = "stub"
+
+    def __init__(self, model_id, error=None):
+        self.model_id = model_id
+        self.error = error
+        self.calls = []
+
+    def infer(self, image, model_id=None):
+        self.calls.append(model_id)
+        if self.error:
+            raise self.error
+        return {"predictions": [], "model": self.model_id}
+
+
+def test_fallback_never_answers_another_model_locally():
+    remote = Stub("ppe-ukjvg/3", error=ConnectionError("down"))
+    local = Stub("ppe-ukjvg/3")
+    backend = FallbackBackend(remote, local, timeout=1.0)
+    with pytest.raises(ConnectionError):
+        backend.infer(None, "ppe-ukjvg/2")
+    assert local.calls == []
+    # The active model still falls back
+    assert backend.infer(None, "ppe-ukjvg/3")["model"] == "ppe-ukjvg/3"
@@ -0,0 +1,48 @@
+import pytest
+
+import inference_client
+from detector_backends import LocalONNXBackend
+from eval_runner import EvaluationRunner, PredictionCache
+
+
+class FakeClient:
+    """Answers with the model its backend was built for, like a local export would."""
+
+    def __init__(self, kind=None, model_id=None, **kwargs):
+        self.kind = kind
+        self.model_id = model_id
+
+    def infer(self, image, model_id=None):
+        return {"predictions": [], "served_by": self.model_id}
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "a.jpg"
+    path.write_bytes(b"not really a jpeg")
+    return str(path)
+
+
+def make_runner(tmp_path, backend):
+    return EvaluationRunner(backend=backend, cache=PredictionCache(str(tmp_path / "cache.db")), workers=2)
+
+
+def test_local_backend_runs_each_models_own_export(tmp_path, image, monkeypatch):
+    monkeypatch.setattr(inference_client, "InferenceClient", FakeClient)
+    runner = make_runner(tmp_path, "local")
+    out = runner.run([image], ["ppe-ukjvg/3", "ppe-ukjvg/2"])
+    assert out["ppe-ukjvg/3"][image]["served_by"] == "ppe-ukjvg/3"
+    assert out["ppe-ukjvg/2"][image]["served_by"] == "ppe-ukjvg/2"
+
+
+def test_remote_backend_shares_one_client(tmp_path, image, monkeypatch):
+    monkeypatch.setattr(inference_client, "InferenceClient", FakeClient)
+    runner = make_runner(tmp_path, "remote")
+    assert runner.client("ppe-ukjvg/3") is runner.client("ppe-ukjvg/2")
+
+
+def test_local_backend_rejects_other_model_ids():
+    backend = LocalONNXBackend.__new__(LocalONNXBackend)
+    backend.model_id = "ppe-ukjvg/3"
+    with pytest.raises(ValueError, match="not ppe-ukjvg/2"):
+        backend.infer(None, "ppe-ukjvg/2")
@@ -0,0 +1,28 @@
+import numpy as np
+
+from evaluation import Evaluator
+from postprocess import Detections
+
+NAMES = ["hardhat", "vest", "person"]
+
+
+def test_unknown_ground_truth_classes_are_skipped():
+    detections = Detections([[10, 10, 50, 50], [100, 100, 200, 300]], [0.9, 0.8], [0, 2], NAMES)
+    gt_xyxy = [[10, 10, 50, 50], [100, 100, 200, 300]]
+
+    evaluator = Evaluator(class_names=("hardhat", "vest"), iou_thresholds=(0.5,))
+    evaluator.add(detections, gt_xyxy, ["hardhat", "person"])
+
+    reference = Evaluator(class_names=("hardhat", "vest"), iou_thresholds=(0.5,))
+    reference.add(Detections([[10, 10, 50, 50]], [0.9], [0], NAMES), [[10, 10, 50, 50]], ["hardhat"])
+
+    assert evaluator.num_gt.tolist() == [1, 0]
+    assert np.array_equal(evaluator.confusion, reference.confusion)
+    assert evaluator.summary() == reference.summary()
+
+
+def test_only_unknown_ground_truth():
+    evaluator = Evaluator(class_names=("hardhat", "vest"), iou_thresholds=(0.5,))
+    evaluator.add(Detections.empty(NAMES), [[0, 0, 10, 10]], ["person"])
+    assert evaluator.num_gt.tolist() == [0, 0]
+    assert evaluator.confusion.sum() == 0
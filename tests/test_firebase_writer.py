@@ -0,0 +1,98 @@
+import time
+
+from firebase_writer import FirebaseWriteQueue, is_permanent
+
+FORBIDDEN = set(".$#[]")
+
+
+class FakeRef:
+    """Root reference that refuses keys Firebase would refuse, and can be taken offline."""
+
+    def __init__(self):
+        self.data = {}
+        self.offline = False
+
+    def update(self, values):
+        if self.offline:
+            raise ConnectionError("network unreachable")
+        for path in values:
+            if set(path) & FORBIDDEN:
+                raise ValueError(f"Invalid path: {path}")
+        self.data.update(values)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def make_queue(tmp_path, ref):
+    return FirebaseWriteQueue(root_ref=ref, journal_path=str(tmp_path / "journal.jsonl"), flush_interval=0,
+                              retry_interval=0.05, rejected_path=str(tmp_path / "rejected.jsonl")).start()
+
+
+def test_rejected_record_does_not_block_gate_writes(tmp_path):
+    ref = FakeRef()
+    writer = make_queue(tmp_path, ref)
+    done = []
+    writer.set("DWS-In-Out/2026-10-18 09:32:19 #12", {"ID Number": "A"}, callback=lambda: done.append("bad"))
+    writer.set("/door_status", 1, callback=lambda: done.append("door"))
+    wait_for(lambda: "door_status" in ref.data)
+    writer.set("/front", 0)
+    wait_for(lambda: "front" in ref.data)
+    writer.stop()
+    assert done == ["door"]
+    assert writer.journal_count == 0
+    assert writer.stats()["rejected"] == 1
+    assert "#12" in (tmp_path / "rejected.jsonl").read_text()
+
+
+def test_transient_errors_are_journaled_and_replayed(tmp_path):
+    ref = FakeRef()
+    ref.offline = True
+    writer = make_queue(tmp_path, ref)
+    writer.set("/front", 1)
+    wait_for(lambda: writer.journal_count == 1)
+    writer.set("/other", 5)
+    wait_for(lambda: writer.journal_count == 2)
+    ref.offline = False
+    # The newer /front write goes out with the journaled one it supersedes, and wins
+    writer.set("/front", 0)
+    wait_for(lambda: writer.journal_count == 0)
+    writer.stop()
+    assert ref.data == {"front": 0, "other": 5}
+    assert writer.stats()["rejected"] == 0
+
+
+def test_unserializable_record_is_rejected_while_offline(tmp_path):
+    ref = FakeRef()
+    ref.offline = True
+    writer = make_queue(tmp_path, ref)
+    writer.set("/snapshot", {"frame": object()})
+    writer.set("/front", 1)
+    wait_for(lambda: writer.journal_count == 1 and writer.stats()["rejected"] == 1)
+    ref.offline = False
+    writer.set("/other", 2)
+    wait_for(lambda: writer.journal_count == 0)
+    assert writer.thread.is_alive()
+    writer.stop()
+    assert ref.data == {"front": 1, "other": 2}
+    assert "snapshot" in (tmp_path / "rejected.jsonl").read_text()
+
+
+def test_is_permanent():
+    class HTTPResponse:
+        def __init__(self, status_code):
+            self.status_code = status_code
+
+    class HTTPError(Exception):
+        def __init__(self, status_code):
+            self.http_response = HTTPResponse(status_code)
+
+    assert is_permanent(ValueError("Invalid path"))
+    assert is_permanent(HTTPError(400))
+    assert not is_permanent(HTTPError(503))
+    assert not is_permanent(HTTPError(429))
+    assert not is_permanent(ConnectionError("reset"))
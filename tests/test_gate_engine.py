@@ -0,0 +1,184 @@
+import os
+import sys
+import time
+import subprocess
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import config
+from attendance_store import AttendanceStore
+from compliance_cache import ComplianceCache
+from gate_engine import GateEngine, IDLE, SCAN
+from lanes import Lane
+
+ZERO_TIMINGS = {"qr_countdown": 0, "ppe_countdown": 0, "granted_delay": 0, "retry_delay": 0, "result": 0,
+                "quality_retry": 0, "confirm_delay": 0}
+# One compliant worker in the middle of the (rotated) PPE frame, (cx, cy, w, h) as fractions
+WORKER = {"hardhat": (0.5, 0.25, 0.125, 0.1), "vest": (0.5, 0.5, 0.25, 0.25), "gloves": (0.33, 0.7, 0.08, 0.08)}
+
+
+class FakeCamera:
+    def __init__(self, frame):
+        self.frame = frame
+        self.seq = 1
+
+    def latest(self):
+        return self.seq, self.frame
+
+    def recent(self):
+        return [(self.seq, 0.0, self.frame)]
+
+    def wait_for_frame(self, after_seq=0, timeout=1.0):
+        time.sleep(0.01)
+        self.seq = max(self.seq, after_seq) + 1
+        return self.seq, self.frame
+
+
+class FakeCameras:
+    def __init__(self, frame):
+        self.camera = FakeCamera(frame)
+
+    def get(self, index):
+        return self.camera
+
+
+class FakeDetector:
+    def __init__(self):
+        self.calls = 0
+
+    def infer(self, image, model_id=None):
+        self.calls += 1
+        h, w = image.shape[:2]
+        return {"predictions": [{"x": w * cx, "y": h * cy, "width": w * bw, "height": h * bh, "confidence": 0.9,
+                                 "class": name} for name, (cx, cy, bw, bh) in WORKER.items()]}
+
+
+class FakeDecoder:
+    def submit(self, frame, seq, callback, lane=None):
+        return True
+
+    def record_write(self, result):
+        pass
+
+
+class FakeWriter:
+    def set(self, path, value, callback=None):
+        pass
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PPE_CHECK_MODE", "countdown")
+    monkeypatch.setattr(config, "SAVE_ANNOTATED_RESULT", False)
+    lane = Lane("test", "qr_front", "qr_back", "ppe", trigger_source="fake")
+    lane.quality.enabled = False
+    frame = np.full((480, 640, 3), 128, dtype=np.uint8)
+    engine = GateEngine(lane, FakeDetector(), FakeCameras(frame), FakeDecoder(), FakeWriter(),
+                        AttendanceStore(str(tmp_path / "attendance.db")), timings=ZERO_TIMINGS,
+                        compliance=ComplianceCache(enabled=False))
+    engine.step()
+    return engine
+
+
+def run_session(engine, id_number, max_steps=50, timeout=None):
+    """Trigger /front, scan id_number and step until the lane is idle again."""
+    sessions = engine.sessions
+    engine.lane.triggers.set("front", 1)
+    for _ in range(max_steps):
+        engine.step()
+        if engine.state == SCAN:
+            break
+    engine.post("decoded", SimpleNamespace(data=[id_number]))
+    deadline = None if timeout is None else time.monotonic() + timeout
+    steps = 0
+    while steps < max_steps or (deadline is not None and time.monotonic() < deadline):
+        engine.step(0.02 if deadline is not None else 0.0)
+        steps += 1
+        if engine.sessions > sessions and engine.state == IDLE:
+            return
+    raise AssertionError(f"session for {id_number} did not finish (state {engine.state})")
+
+
+def test_tracked_result_is_not_reused_for_another_id(engine):
+    run_session(engine, "WORKER-A")
+    assert engine.detector.calls == 1
+    # Someone else scans while the previous worker's compliant track is still live
+    run_session(engine, "WORKER-B")
+    assert engine.detector.calls == 2
+    assert engine.lane.tracker.stats()["cache_hits"] == 0
+
+
+def test_tracked_result_is_reused_for_the_same_id(engine):
+    run_session(engine, "WORKER-A")
+    run_session(engine, "WORKER-A")
+    assert engine.detector.calls == 1
+    assert engine.lane.tracker.stats()["cache_hits"] == 1
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_tracked_result_is_reused_with_the_gate_timings(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PPE_CHECK_MODE", "countdown")
+    monkeypatch.setattr(config, "SAVE_ANNOTATED_RESULT", False)
+    clock = FakeClock()
+    lane = Lane("test", "qr_front", "qr_back", "ppe", trigger_source="fake")
+    lane.quality.enabled = False
+    lane.tracker.clock = clock
+    frame = np.full((480, 640, 3), 128, dtype=np.uint8)
+    engine = GateEngine(lane, FakeDetector(), FakeCameras(frame), FakeDecoder(), FakeWriter(),
+                        AttendanceStore(str(tmp_path / "attendance.db")), clock=clock,
+                        compliance=ComplianceCache(enabled=False))
+    engine.step()
+    for _ in range(2):
+        # The tracker sees nothing from the result screen to the next scan's PPE check
+        lane.triggers.set("front", 1)
+        while engine.state != SCAN:
+            engine.step()
+            clock.now += 0.25
+        engine.post("decoded", SimpleNamespace(data=["WORKER-A"]))
+        sessions = engine.sessions
+        while not (engine.sessions > sessions and engine.state == IDLE):
+            engine.step()
+            clock.now += 0.25
+    assert engine.detector.calls == 1
+    assert lane.tracker.stats()["cache_hits"] == 1
+
+
+def worker_in_background(engine, mode, monkeypatch):
+    """The PPE camera already shows the worker when /front fires, so the snapshot is not an empty scene."""
+    monkeypatch.setattr(config, "PPE_CHECK_MODE", mode)
+    engine.lane.quality.enabled = True
+    engine.lane.tracker.enabled = False
+    frame = np.random.default_rng(0).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    engine.cameras.camera.frame = frame
+
+
+def test_stream_check_recovers_when_worker_was_in_the_background(engine, monkeypatch):
+    worker_in_background(engine, "stream", monkeypatch)
+    engine.timings["stream_timeout"] = 0.3
+    run_session(engine, "WORKER-A", timeout=10.0)
+    assert engine.lane.quality.stats()["background_dropped"] == 1
+    assert engine.lane.decisions["granted"] == 1
+
+
+def test_countdown_check_recovers_when_worker_was_in_the_background(engine, monkeypatch):
+    worker_in_background(engine, "countdown", monkeypatch)
+    run_session(engine, "WORKER-A", max_steps=200)
+    assert engine.lane.quality.stats()["background_dropped"] == 1
+    assert engine.detector.calls == 1
+
+
+def test_lanes_import_keeps_cv2_off_the_boot_path():
+    # app_stable_version imports lanes on the main thread before the idle screen
+    code = "import sys, lanes; lanes.Lane('a', 0, 1, 2, trigger_source='fake'); print('cv2' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(config.__file__)))
+    assert out.stdout.strip() == "False"
@@ -0,0 +1,35 @@
+from inference_client import InferenceClient
+from scheduler import LaneScheduler
+from shadow import ShadowDetector
+
+
+class FlakyBackend:
+    """Fails the first call, then answers at once."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def infer(self, image, model_id=None):
+        self.calls += 1
+        if self.calls == 1:
+            raise ConnectionError("reset by peer")
+        return {"predictions": []}
+
+
+class RecordingRunner:
+    def __init__(self):
+        self.offers = []
+
+    def offer(self, image, result, seconds, primary_model=None, lane=None):
+        self.offers.append((seconds, lane))
+
+
+def test_primary_latency_leaves_out_retries_and_backoff():
+    client = InferenceClient(retries=1, backoff=0.3, keepalive_interval=0)
+    client._backend = FlakyBackend()
+    runner = RecordingRunner()
+    detector = LaneScheduler(workers=1, name="shadow-test").detector("a", ShadowDetector(client, runner, "a"))
+    assert detector.infer(None) == {"predictions": []}
+    [(seconds, lane)] = runner.offers
+    assert lane == "a"
+    assert seconds < 0.1
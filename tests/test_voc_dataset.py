@@ -0,0 +1,42 @@
+import os
+
+import numpy as np
+
+import voc_dataset
+from voc_dataset import VOCDataset
+
+XML = """<annotation><filename>{name}.jpg</filename>
+<object><name>hardhat</name><bndbox><xmin>{x}</xmin><ymin>10</ymin><xmax>{x2}</xmax><ymax>50</ymax></bndbox></object>
+</annotation>"""
+
+
+def write_xml(folder, name, x):
+    (folder / f"{name}.xml").write_text(XML.format(name=name, x=x, x2=x + 40))
+
+
+def test_partial_rebuild_never_replaces_a_mapped_array(tmp_path, monkeypatch):
+    for i, name in enumerate(["a", "b", "c"]):
+        write_xml(tmp_path, name, 10 * i)
+    VOCDataset(str(tmp_path))
+    mapped = VOCDataset(str(tmp_path))
+    assert mapped.parsed == 0 and isinstance(mapped.boxes, np.memmap)
+
+    # Windows refuses to replace (or delete) a file that is still memory-mapped
+    replace = os.replace
+    def refuse_npy(src, dst):
+        if str(dst).endswith(".npy") and os.path.exists(dst):
+            raise PermissionError(dst)
+        replace(src, dst)
+    monkeypatch.setattr(voc_dataset.os, "replace", refuse_npy)
+
+    write_xml(tmp_path, "b", 1000)
+    rebuilt = VOCDataset(str(tmp_path))
+    assert rebuilt.parsed == 1
+    assert rebuilt.boxes[:, 0].tolist() == [0, 1000, 20]
+    assert mapped.boxes[:, 0].tolist() == [0, 10, 20]
+    assert VOCDataset(str(tmp_path)).boxes[:, 0].tolist() == [0, 1000, 20]
+
+    del mapped
+    write_xml(tmp_path, "c", 2000)
+    VOCDataset(str(tmp_path))
+    assert len([f for f in os.listdir(tmp_path / ".voc_cache") if f.endswith(".npy")]) == 3
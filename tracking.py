@@ -0,0 +1,238 @@
+import time
+import threading
+from itertools import count
+
+import numpy as np
+
+import config
+import metrics
+from postprocess import iou_matrix
+from ppe_stream import ComplianceWindow
+
+
+def expand(box, ratios):
+    """Grow an xyxy box by (left, top, right, bottom) multiples of its width/height."""
+    x0, y0, x1, y1 = box
+    w, h = x1 - x0, y1 - y0
+    left, top, right, bottom = ratios
+    return np.array([x0 - left * w, y0 - top * h, x1 + right * w, y1 + bottom * h], dtype=np.float32)
+
+
+def containment(boxes, regions):
+    """(N, M) fraction of each box's area that lies inside each region."""
+    x0 = np.maximum(boxes[:, None, 0], regions[None, :, 0])
+    y0 = np.maximum(boxes[:, None, 1], regions[None, :, 1])
+    x1 = np.minimum(boxes[:, None, 2], regions[None, :, 2])
+    y1 = np.minimum(boxes[:, None, 3], regions[None, :, 3])
+    inter = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+    area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area, 1e-9)[:, None]
+
+
+class Track:
+    """One person followed across PPE camera frames, with their own compliance window."""
+
+    def __init__(self, track_id, box, now):
+        self.id = track_id
+        self.box = box
+        self.first_seen = now
+        self.last_seen = now
+        self.frames = 0
+        self.window = ComplianceWindow()
+        self.present = set()
+        # Latest frame and detections, kept for the result screen when compliance comes from the cache
+        self.frame = None
+        self.detections = None
+        self.flags = None
+        self.compliant_at = None
+        # Scanned ID whose passed check this track's result belongs to
+        self.owner = None
+
+    def center(self):
+        return (self.box[0] + self.box[2]) / 2, (self.box[1] + self.box[3]) / 2
+
+    def area(self):
+        return float((self.box[2] - self.box[0]) * (self.box[3] - self.box[1]))
+
+
+class PersonTracker:
+    """Groups PPE boxes under people and follows them across frames by IoU, then centroid distance.
+
+    A person is a TRACK_PERSON_CLASS box when the model has one. The PPE model has no
+    person class, so otherwise a person's region is estimated from their vest (torso)
+    or, without a vest, their hardhat, grown by TRACK_BODY_RATIOS to cover head, arms
+    and hands. Each PPE box belongs to the region holding most of its area. Decisions
+    are taken on the track nearest TRACK_GATE_POINT, so a bystander's hardhat no longer
+    completes the worker's PPE. With enabled=False every box belongs to one
+    whole-frame "person", which is the old group check.
+    """
+
+    def __init__(self, enabled=config.PPE_TRACKING, iou_threshold=config.TRACK_IOU,
+                 max_distance=config.TRACK_MAX_DISTANCE, max_age=config.TRACK_MAX_AGE,
+                 idle_ttl=config.TRACK_IDLE_TTL, compliance_ttl=config.TRACK_COMPLIANCE_TTL, gate_point=config.TRACK_GATE_POINT,
+                 person_class=config.TRACK_PERSON_CLASS, body_ratios=config.TRACK_BODY_RATIOS,
+                 min_containment=config.TRACK_MIN_CONTAINMENT, clock=time.monotonic):
+        self.enabled = enabled
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.max_age = max_age
+        self.idle_ttl = idle_ttl
+        self.compliance_ttl = compliance_ttl
+        self.gate_point = gate_point
+        self.person_class = person_class
+        self.body_ratios = body_ratios
+        self.min_containment = min_containment
+        self.clock = clock
+        self.tracks = {}
+        self.ids = count(1)
+        self.frame_shape = None
+        self.counts = {"tracks": 0, "unassigned_boxes": 0, "cache_hits": 0, "cache_misses": 0}
+        self.lock = threading.Lock()
+
+    def people(self, detections, frame_shape=None):
+        """Return (regions (M, 4), owner (N,)) with owner -1 for boxes outside every region."""
+        labels = np.array(detections.labels, dtype=object)
+        if not self.enabled:
+            h, w = frame_shape[:2] if frame_shape is not None else (1e9, 1e9)
+            return np.array([[0, 0, w, h]], dtype=np.float32), np.zeros(len(detections), dtype=int)
+        if len(detections) == 0:
+            return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=int)
+        people = labels == self.person_class
+        if people.any():
+            regions = detections.xyxy[people]
+        else:
+            regions = []
+            for anchor, ratios in self.body_ratios.items():
+                for box in detections.xyxy[labels == anchor]:
+                    cx, cy = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+                    # A hardhat on someone whose vest already made a region belongs to that region
+                    if any(r[0] <= cx <= r[2] and r[1] <= cy <= r[3] for r in regions):
+                        continue
+                    regions.append(expand(box, ratios))
+            regions = np.array(regions, dtype=np.float32).reshape(-1, 4)
+        owner = np.full(len(detections), -1)
+        if len(regions):
+            inside = containment(detections.xyxy, regions)
+            best = inside.argmax(axis=1)
+            owner = np.where(inside[np.arange(len(detections)), best] >= self.min_containment, best, -1)
+        owner[people] = -1
+        return regions, owner
+
+    def update(self, detections, frame=None):
+        """Associate this frame's people with tracks, update their windows; returns the nearest track."""
+        now = self.clock()
+        regions, owner = self.people(detections, None if frame is None else frame.shape)
+        with self.lock:
+            if frame is not None:
+                self.frame_shape = frame.shape[:2]
+            matches = self._associate(regions)
+            ppe = np.array(detections.labels, dtype=object) != self.person_class
+            self.counts["unassigned_boxes"] += int(((owner < 0) & ppe).sum())
+            for i, region in enumerate(regions):
+                track = matches.get(i)
+                if track is None:
+                    track_id = next(self.ids)
+                    track = self.tracks[track_id] = Track(track_id, region, now)
+                    self.counts["tracks"] += 1
+                track.box = region
+                track.last_seen = now
+                track.frames += 1
+                track.detections = detections[owner == i]
+                track.present = track.window.add(track.detections)
+                track.frame = frame
+                if track.window.is_compliant():
+                    track.flags = track.window.flags()
+                    track.compliant_at = now
+            for track_id in [t.id for t in self.tracks.values() if now - t.last_seen > self.max_age]:
+                del self.tracks[track_id]
+            return self._nearest()
+
+    def _associate(self, regions):
+        """Greedy IoU matching, then nearest centroid (relative to the region's size) for the rest."""
+        tracks = list(self.tracks.values())
+        matches, used = {}, set()
+        if not tracks or not len(regions):
+            return matches
+        iou = iou_matrix(regions, np.array([t.box for t in tracks], dtype=np.float32))
+        for flat in np.argsort(-iou, axis=None):
+            i, j = (int(k) for k in np.unravel_index(flat, iou.shape))
+            if iou[i, j] < self.iou_threshold:
+                break
+            if i in matches or j in used:
+                continue
+            matches[i] = tracks[j]
+            used.add(j)
+        for i, region in enumerate(regions):
+            if i in matches:
+                continue
+            cx, cy = (region[0] + region[2]) / 2, (region[1] + region[3]) / 2
+            scale = float(np.hypot(region[2] - region[0], region[3] - region[1])) or 1.0
+            best = None
+            for j, track in enumerate(tracks):
+                if j in used:
+                    continue
+                tx, ty = track.center()
+                distance = float(np.hypot(cx - tx, cy - ty)) / scale
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, j)
+            if best is not None:
+                matches[i] = tracks[best[1]]
+                used.add(best[1])
+        return matches
+
+    def _nearest(self):
+        """The track whose region holds the gate point (largest if several), else the closest centre."""
+        if not self.tracks:
+            return None
+        tracks = list(self.tracks.values())
+        if self.frame_shape is None:
+            return max(tracks, key=Track.area)
+        h, w = self.frame_shape
+        gx, gy = self.gate_point[0] * w, self.gate_point[1] * h
+        holding = [t for t in tracks if t.box[0] <= gx <= t.box[2] and t.box[1] <= gy <= t.box[3]]
+        if holding:
+            return max(holding, key=Track.area)
+        return min(tracks, key=lambda t: np.hypot(t.center()[0] - gx, t.center()[1] - gy))
+
+    def nearest(self):
+        with self.lock:
+            return self._nearest()
+
+    def claim(self, id_number, flags):
+        """Tie the nearest track's result to the ID whose check it just passed (also a single-frame pass)."""
+        now = self.clock()
+        with self.lock:
+            track = self._nearest()
+            if track is not None:
+                track.owner = id_number
+                track.flags = dict(flags)
+                track.compliant_at = now
+
+    def cached(self, id_number):
+        """The nearest track if it is still live, passed id_number's check and did so within compliance_ttl.
+
+        The tracker is only fed while a check runs, so a track last seen at the end of the
+        previous session counts as live for idle_ttl, not max_age. A result belongs to the
+        ID it was claimed for, so the next worker to scan never gets through on the
+        previous worker's PPE, even standing in the same spot.
+        """
+        if not self.enabled:
+            return None
+        now = self.clock()
+        with self.lock:
+            track = self._nearest()
+            hit = (track is not None and track.compliant_at is not None and track.owner is not None
+                   and track.owner == id_number
+                   and now - track.last_seen <= self.idle_ttl and now - track.compliant_at <= self.compliance_ttl)
+            self.counts["cache_hits" if hit else "cache_misses"] += 1
+        metrics.inc("track_cache", result="hit" if hit else "miss")
+        return track if hit else None
+
+    def reset(self):
+        """Forget every track, e.g. when the next person at the gate must be checked from scratch."""
+        with self.lock:
+            self.tracks.clear()
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts, active=len(self.tracks))
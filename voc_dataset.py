@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import config
+
+CACHE_VERSION = 2
+ARRAYS = ("boxes", "class_ids", "offsets")
+
+
+def parse_voc_xml(xml_file):
+    """Parse one Pascal VOC file -> (image filename, [(class name, xmin, ymin, xmax, ymax), ...])."""
+    root = ET.parse(xml_file).getroot()
+    filename = root.findtext("filename") or os.path.splitext(os.path.basename(xml_file))[0]
+    objects = []
+    for obj in root.findall("object"):
+        bndbox = obj.find("bndbox")
+        objects.append((
+            obj.find("name").text.strip(),
+            int(float(bndbox.find("xmin").text)),
+            int(float(bndbox.find("ymin").text)),
+            int(float(bndbox.find("xmax").text)),
+            int(float(bndbox.find("ymax").text)),
+        ))
+    return filename, objects
+
+
+class VOCDataset:
+    """Pascal VOC folder loaded into flat arrays, cached next to the XML files.
+
+    boxes (N, 4) int32 xyxy and class_ids (N,) int16 hold every object of every image;
+    image i owns rows offsets[i]:offsets[i + 1]. The arrays are .npy files opened with
+    mmap, so a warm load reads only the small JSON index. The index stores each XML's
+    mtime and size, and only files that changed since are re-parsed (in a process pool
+    when there are many).
+    """
+
+    def __init__(self, folder, cache_dir=None, class_names=config.EVAL_CLASSES,
+                 aliases=config.VOC_CLASS_ALIASES, workers=None):
+        self.folder = folder
+        self.cache_dir = cache_dir or os.path.join(folder, ".voc_cache")
+        self.aliases = aliases
+        self.workers = workers
+        self.class_names = list(class_names)
+        self.xml_files = []
+        self.image_names = []
+        self.boxes = np.zeros((0, 4), dtype=np.int32)
+        self.class_ids = np.zeros(0, dtype=np.int16)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.parsed = 0
+        self.load()
+
+    # --- Cache ---
+
+    def _scan(self):
+        stats = {}
+        for entry in os.scandir(self.folder):
+            if entry.is_file() and entry.name.lower().endswith(".xml"):
+                st = entry.stat()
+                stats[entry.name] = [st.st_mtime_ns, st.st_size]
+        return dict(sorted(stats.items()))
+
+    def _read_cache(self):
+        index_path = os.path.join(self.cache_dir, "index.json")
+        try:
+            with open(index_path, encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") != CACHE_VERSION:
+                return None
+            arrays = {name: np.load(os.path.join(self.cache_dir, f"{name}.{index['generation']}.npy"), mmap_mode="r")
+                      for name in ARRAYS}
+        except (OSError, ValueError):
+            return None
+        return index, arrays
+
+    def _write_cache(self, stats):
+        """Write the arrays under a new generation name, then point the index at them.
+
+        The previous generation may still be memory-mapped (by this process or another
+        one), and Windows refuses to replace or delete a mapped file, so its arrays are
+        never overwritten; they are removed once nothing maps them any more.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        generation = f"{time.time_ns():x}"
+        for name in ARRAYS:
+            np.save(os.path.join(self.cache_dir, f"{name}.{generation}.npy"), getattr(self, name))
+        index = {"version": CACHE_VERSION, "generation": generation, "class_names": self.class_names,
+                 "files": stats, "xml_files": self.xml_files, "image_names": self.image_names}
+        tmp = os.path.join(self.cache_dir, "index.tmp.json")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp, os.path.join(self.cache_dir, "index.json"))
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npy") and f".{generation}." not in entry.name:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    # Still mapped somewhere; a later rebuild tries again
+                    pass
+
+    def _class_id(self, name):
+        name = self.aliases.get(name, name)
+        if name not in self.class_names:
+            self.class_names.append(name)
+        return self.class_names.index(name)
+
+    def _parse(self, names):
+        paths = [os.path.join(self.folder, name) for name in names]
+        if len(paths) >= config.VOC_PARALLEL_MIN_FILES:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                return list(pool.map(parse_voc_xml, paths, chunksize=64))
+        return [parse_voc_xml(path) for path in paths]
+
+    def load(self):
+        self._by_stem = None
+        stats = self._scan()
+        cached = self._read_cache()
+        old = {}
+        if cached is not None:
+            index, arrays = cached
+            self.class_names = index["class_names"]
+            unchanged = [i for i, name in enumerate(index["xml_files"]) if index["files"].get(name) == stats.get(name)]
+            if len(unchanged) == len(stats) == len(index["xml_files"]):
+                # Nothing changed: keep the memory-mapped arrays as they are
+                self.xml_files = index["xml_files"]
+                self.image_names = index["image_names"]
+                self.boxes, self.class_ids, self.offsets = arrays["boxes"], arrays["class_ids"], arrays["offsets"]
+                return self
+            for i in unchanged:
+                start, stop = arrays["offsets"][i], arrays["offsets"][i + 1]
+                # Copied, so nothing keeps the old generation mapped once the cache is rewritten
+                old[index["xml_files"][i]] = (index["image_names"][i], np.array(arrays["boxes"][start:stop]),
+                                              np.array(arrays["class_ids"][start:stop]))
+            arrays = cached = None
+
+        changed = [name for name in stats if name not in old]
+        fresh = dict(zip(changed, self._parse(changed)))
+        self.parsed = len(changed)
+
+        boxes, class_ids, counts = [], [], []
+        self.xml_files = list(stats)
+        self.image_names = []
+        for name in self.xml_files:
+            if name in old:
+                image_name, b, c = old[name]
+            else:
+                image_name, objects = fresh[name]
+                b = np.array([o[1:] for o in objects], dtype=np.int32).reshape(-1, 4)
+                c = np.array([self._class_id(o[0]) for o in objects], dtype=np.int16)
+            self.image_names.append(image_name)
+            boxes.append(b)
+            class_ids.append(c)
+            counts.append(len(c))
+        self.boxes = np.concatenate(boxes) if boxes else np.zeros((0, 4), dtype=np.int32)
+        self.class_ids = np.concatenate(class_ids) if class_ids else np.zeros(0, dtype=np.int16)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self._write_cache(stats)
+        return self
+
+    # --- Access ---
+
+    def __len__(self):
+        return len(self.xml_files)
+
+    def index_of(self, name):
+        """Index of an image by XML or image file name (extension ignored)."""
+        if self._by_stem is None:
+            self._by_stem = {}
+            for i, (xml_name, image_name) in enumerate(zip(self.xml_files, self.image_names)):
+                self._by_stem[os.path.splitext(image_name)[0]] = i
+                self._by_stem[os.path.splitext(xml_name)[0]] = i
+        return self._by_stem[os.path.splitext(os.path.basename(name))[0]]
+
+    def annotations(self, i):
+        """(xyxy int32 array, class name list) for image i."""
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return np.asarray(self.boxes[start:stop]), [self.class_names[k] for k in self.class_ids[start:stop]]
+
+    def objects(self, i):
+        """Image i in the notebook's old format: [(class name, [x, y, w, h]), ...]."""
+        boxes, names = self.annotations(i)
+        return [(name, [int(x0), int(y0), int(x1 - x0), int(y1 - y0)]) for name, (x0, y0, x1, y1) in zip(names, boxes)]